@@ -30,10 +30,19 @@
 # The code here was written by Simon Parsons, based on examples from
 # the PacMan AI projects.
 
-from random import random
+from collections import OrderedDict
 from pacman import Directions
+import mazeDistances
+import randomStreams
 import util
 
+# NumPy is optional. It is only needed for the array versions of the
+# sensors (foodArray() and so on).
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 #
 # Parameters
 #
@@ -61,13 +70,29 @@ directionProb = 0.8
 # 
 # Sensing
 #
+# Each of the functions here reads from an Observation of the state
+# (see observe() below), which works each sensor out once per state
+# however many times it is asked, and then gives out a copy.
+#
+def observe(state):
+    # Returns an Observation of state: everything Pacman can sense in
+    # it, each part worked out the first time it is asked for. The
+    # last one made is kept, so all the sensing on one turn shares it.
+
+    global lastObservation
+    observation = lastObservation
+    if observation is None or observation.state is not state:
+        observation = Observation(state)
+        lastObservation = observation
+    return observation
+
 def whereAmI(state):
     # Returns an (x, y) pair of Pacman's position.
     #
     # This version says exactly where Pacman is.
     # In later version this may be obfusticated.
 
-    return state.getPacmanPosition()
+    return observe(state).position()
 
 def legalActions(state):
     # Returns the legal set of actions
@@ -75,7 +100,7 @@ def legalActions(state):
     # Just pulls this data out of the state. Function included so that
     # all interactions are through this API.
     
-    return state.getLegalPacmanActions()
+    return list(observe(state).legal())
 
 def ghosts(state):
     # Returns a list of (x, y) pairs of ghost positions.
@@ -84,7 +109,7 @@ def ghosts(state):
     # In later versions this will be more restricted, and include some
     # uncertainty.
             
-    return state.getGhostPositions()
+    return list(observe(state).ghosts())
 
 def ghostStates(state):
     # Returns the position of the ghsosts, plus an indication of
@@ -97,25 +122,14 @@ def ghostStates(state):
     # where "state" is 1 if the relevant ghost is scared/edible, and 0
     # otherwise.
     
-    ghostStateInfo = state.getGhostStates()
-    ghostStates = []
-    for s in ghostStateInfo:
-        if s.scaredTimer > 0:
-            ghostStates.append((s.getPosition(), 1))
-        else:
-            ghostStates.append((s.getPosition(), 0))
-    return ghostStates
+    return list(observe(state).ghostStates())
 
 def ghostStatesWithTimes(state):
     # Just as ghostStates(), but when the ghost is in scared/edible
     # mode, "state" is a time value (how much longer the ghost will
     # remain scared/edible) rather than 1.
     
-    ghostStateInfo = state.getGhostStates()
-    ghostStates = []
-    for s in ghostStateInfo:
-        ghostStates.append((s.getPosition(), s.scaredTimer))
-    return ghostStates
+    return list(observe(state).ghostStatesWithTimes())
 
 def capsules(state):
     # Returns a list of (x, y) pairs of capsule positions.
@@ -133,7 +147,18 @@ def capsules(state):
     #
     # In both cases, walls block the view.
     
-    return state.getCapsules()
+    return list(observe(state).capsules())
+
+def capsuleSet(state):
+    # Returns the same capsules as capsules(), as a set of (x, y) pairs.
+
+    return observe(state).capsuleIndex().set
+
+def capsuleBits(state):
+    # Returns the same capsules as capsules(), as a bitset: bit
+    # x*height + y is set if there is a capsule at (x, y).
+
+    return observe(state).capsuleIndex().bits
 
 def food(state):
     # Returns a list of (x, y) pairs of food positions
@@ -150,18 +175,24 @@ def food(state):
     # 2) Pacman is not moving, and the food is within the visibilityLimit.
     #
     # In both cases, walls block the view.
-    
-    foodList= []
-    foodGrid = state.getFood()
-    width = foodGrid.width
-    height = foodGrid.height
-    for i in range(width):
-        for j in range(height):
-            if foodGrid[i][j] == True:
-                foodList.append((i, j))
-            
+    #
+    # The list comes from the food index (see foodIndex() below), so
+    # the grid is only scanned when the index can't be brought up to
+    # date from the last one.
+
     # Return list of food that is visible
-    return foodList
+    return list(observe(state).food())
+
+def foodSet(state):
+    # Returns the same food as food(), as a set of (x, y) pairs.
+
+    return observe(state).foodSet()
+
+def foodBits(state):
+    # Returns the same food as food(), as a bitset: bit x*height + y
+    # is set if there is food at (x, y).
+
+    return observe(state).foodBits()
 
 def walls(state):
     # Returns a list of (x, y) pairs of wall positions
@@ -169,36 +200,81 @@ def walls(state):
     # This version just returns all the current wall locations
     # extracted from the state data.  In later versions, this will be
     # restricted by distance, and include some uncertainty.
-    
-    wallList= []
-    wallGrid = state.getWalls()
-    width = wallGrid.width
-    height = wallGrid.height
-    for i in range(width):
-        for j in range(height):
-            if wallGrid[i][j] == True:
-                wallList.append((i, j))            
-    return wallList
+    #
+    # The walls don't change during a game, so the list is only worked
+    # out once per layout (see wallIndex() below).
+
+    return list(observe(state).walls())
+
+def wallSet(state):
+    # Returns the same walls as walls(), as a set of (x, y) pairs.
+
+    return observe(state).wallSet()
+
+def wallBits(state):
+    # Returns the same walls as walls(), as a bitset: bit x*height + y
+    # is set if there is a wall at (x, y).
+
+    return observe(state).wallBits()
 
 def corners(state):
     # Returns the coordinates of the four corners of the state space.
     #
     # For harder exploration we could obfusticate this information.
 
-    corners=[]
-    wallGrid = state.getWalls()
-    width = wallGrid.width
-    height = wallGrid.height
-    corners.append((0, 0))
-    corners.append((width-1, 0))
-    corners.append((0, height-1))
-    corners.append((width-1, height-1))
-    return corners
+    return list(observe(state).corners())
+
+def mazeDistance(a, b, state):
+    # Returns the length of the shortest path from a to b that doesn't
+    # go through a wall, unlike util.manhattanDistance. The distances
+    # for the whole layout are worked out the first time, and kept on
+    # disk (see mazeDistances.py), so after that this is a lookup.
+
+    return distanceTable(state).distance(a, b)
+
+def distanceTable(state):
+    # Returns the MazeDistances for the layout of state.
+
+    walls = observe(state).wallIndex()
+    if walls.distances is None:
+        walls.distances = mazeDistances.load(state.getWalls())
+    return walls.distances
+
+#
+# Array sensing
+#
+# The same information as food(), walls() and so on, as NumPy arrays
+# shaped (width, height), so that array[x, y] is about (x, y). They
+# are built straight from the game's grids, are shared between calls,
+# and so can't be written to: take a copy to change one. They need
+# NumPy to be installed.
+#
+def foodArray(state):
+    # Returns a boolean array that is True where there is food.
+
+    return observe(state).foodArray()
+
+def wallArray(state):
+    # Returns a boolean array that is True where there is a wall.
+
+    return observe(state).wallArray()
+
+def capsuleArray(state):
+    # Returns a boolean array that is True where there is a capsule.
+
+    return observe(state).capsuleArray()
+
+def ghostArray(state):
+    # Returns an integer array of how many ghosts there are in each
+    # cell. A ghost between two cells counts as in the one with the
+    # lower x or y, as int() would put it.
+
+    return observe(state).ghostArray()
                 
 #
 # Acting
 #
-def makeMove(direction, legal):
+def makeMove(direction, legal, state=None):
     # This version implements non-deterministic movement.
     #
     # Paacman has a probability of directionProb of moving in the
@@ -220,7 +296,13 @@ def makeMove(direction, legal):
         # direction with probability directionProb.
         #
         # Otherwise make a different move.
-        sample = random()
+        #
+        # The sample comes from the motion stream of the game that
+        # state is from (see randomStreams.py), which hands out numbers
+        # drawn a block at a time. It is the random module instead
+        # unless the game was given streams of its own, or no state is
+        # passed.
+        sample = randomStreams.stream(state, "motion").random()
         if sample <= directionProb:
             # Here the non-deterministic action selection says to
             # return the original move, but we need to check it is
@@ -234,7 +316,7 @@ def makeMove(direction, legal):
             else:
                 return Directions.STOP
         else:
-            return selectNewMove(direction, legal)
+            return selectNewMove(direction, legal, state)
     else:
         # When actions are deterministic, Pacman moves in the
         # specified direction
@@ -244,76 +326,343 @@ def makeMove(direction, legal):
 # Details that you don't need to look at if you don't want to.
 #
 
+class CellIndex:
+    # A set of cells kept three ways: as a list in the order food()
+    # has always returned them (by x, then by y), as a set, and as a
+    # bitset with bit x*height + y for (x, y).
+
+    def __init__(self, cells, height):
+        self.list = cells
+        self.set = frozenset(cells)
+        self.height = height
+        self.bits = 0
+        for (x, y) in cells:
+            self.bits |= 1 << (x * height + y)
+        # The cells as an array, once one has been asked for
+        self.array = None
+
+    def without(self, cell):
+        # The same cells less cell.
+        index = CellIndex([], self.height)
+        index.list = [other for other in self.list if other != cell]
+        index.set = self.set - frozenset([cell])
+        index.bits = self.bits & ~(1 << (cell[0] * self.height + cell[1]))
+        return index
+
+# Food indexes for the food grids seen most recently, keyed by the
+# identity of the grid's data, along with the data itself. Successor
+# states share their food data until something is eaten, when the
+# engine copies it and records the cell in _foodEaten. That only lasts
+# until a ghost moves, but food is only ever eaten where Pacman is, so
+# that will do instead. Agents are given a deep copy of the state each
+# turn, though, so the grid is also compared with the last one.
+foodIndexes = OrderedDict()
+foodIndexLimit = 16
+
+def onlyEaten(before, after, eaten):
+    # True if the food grid data after is before with the food at eaten
+    # gone. The columns are compared as whole lists, which is much
+    # quicker than looking at each cell.
+
+    if len(before) != len(after):
+        return False
+    x, y = eaten
+    for i in range(len(before)):
+        if i != x and before[i] != after[i]:
+            return False
+    column = before[x][:]
+    column[y] = False
+    return column == after[x]
+
+def foodIndex(state):
+    # Returns a CellIndex of the food in state.
+    #
+    # If the food grid is one that has been seen recently, its index
+    # is reused. If not, and the last one used holds the same food, or
+    # the same with the food just eaten gone, that one is reused or
+    # brought up to date. Otherwise the grid is scanned.
+
+    foodGrid = state.getFood()
+    data = foodGrid.data
+    entry = foodIndexes.pop(id(data), None)
+    if entry is not None and entry[0] is data:
+        foodIndexes[id(data)] = entry
+        return entry[1]
+
+    index = None
+    eaten = state.data._foodEaten
+    if eaten is None:
+        eaten = state.getPacmanPosition()
+    if foodIndexes:
+        lastData, last = foodIndexes[next(reversed(foodIndexes))]
+        if lastData == data:
+            index = last
+        elif eaten in last.set and onlyEaten(lastData, data, eaten):
+            index = last.without(eaten)
+    if index is None:
+        foodList = []
+        for i in range(foodGrid.width):
+            for j in range(foodGrid.height):
+                if data[i][j] == True:
+                    foodList.append((i, j))
+        index = CellIndex(foodList, foodGrid.height)
+
+    foodIndexes[id(data)] = (data, index)
+    while len(foodIndexes) > foodIndexLimit:
+        foodIndexes.popitem(last=False)
+    return index
+
+# Wall indexes for the layouts seen most recently, keyed by the
+# layout's text. The layout is copied along with the state every time
+# an agent is asked for a move, but the lines of text are shared by
+# the copies, so the key is quick to look up. Each also keeps the
+# layout's RayIndex, wall array and maze distances, once those have
+# been needed.
+wallIndexes = OrderedDict()
+wallIndexLimit = 4
+
+def wallIndex(state):
+    # Returns a CellIndex of the walls in state, which also has the
+    # corners of the layout, in corners, and its RayIndex, in rays.
+
+    key = tuple(state.data.layout.layoutText)
+    entry = wallIndexes.pop(key, None)
+    if entry is None:
+        wallGrid = state.getWalls()
+        data = wallGrid.data
+        wallList = []
+        for i in range(wallGrid.width):
+            for j in range(wallGrid.height):
+                if data[i][j] == True:
+                    wallList.append((i, j))
+        entry = CellIndex(wallList, wallGrid.height)
+        width = wallGrid.width
+        height = wallGrid.height
+        entry.corners = [(0, 0), (width-1, 0), (0, height-1), (width-1, height-1)]
+        entry.rays = None
+        entry.array = None
+        entry.distances = None
+    wallIndexes[key] = entry
+    while len(wallIndexes) > wallIndexLimit:
+        wallIndexes.popitem(last=False)
+    return entry
+
+class RayIndex:
+    # The cells Pacman can see from each free cell of a layout, looking
+    # in each direction, as far as the next wall: the ray from that
+    # cell in that direction. Views limited by visibilityLimit and
+    # sideLimit are put together from the rays the first time they are
+    # asked for, and kept.
+
+    vectors = {Directions.NORTH: (0, 1), Directions.SOUTH: (0, -1),
+               Directions.EAST: (1, 0), Directions.WEST: (-1, 0)}
+    sides = {Directions.NORTH: [Directions.WEST, Directions.EAST],
+             Directions.SOUTH: [Directions.WEST, Directions.EAST],
+             Directions.EAST: [Directions.NORTH, Directions.SOUTH],
+             Directions.WEST: [Directions.NORTH, Directions.SOUTH]}
+
+    def __init__(self, wallGrid):
+        # rays[(x, y)][direction] is the list of cells along the ray, in
+        # order, and sets[(x, y)][direction] the same as a set.
+        self.rays = {}
+        self.sets = {}
+        self.views = {}
+        for x in range(wallGrid.width):
+            for y in range(wallGrid.height):
+                if wallGrid[x][y]:
+                    continue
+                self.rays[(x, y)] = {}
+                self.sets[(x, y)] = {}
+                for direction, (dx, dy) in self.vectors.items():
+                    ray = []
+                    next = (x + dx, y + dy)
+                    while not wallGrid[next[0]][next[1]]:
+                        ray.append(next)
+                        next = (next[0] + dx, next[1] + dy)
+                    self.rays[(x, y)][direction] = ray
+                    self.sets[(x, y)][direction] = frozenset(ray)
+
+    def ray(self, cell, direction):
+        # The cells along the ray from cell in direction, as a set.
+        return self.sets[cell][direction]
+
+    def view(self, cell, facing, limit, sideLimit):
+        # The cells that can be seen in front, and to the side, from
+        # cell, facing facing, as a pair of sets. Standing still, every
+        # direction counts as in front.
+        key = (cell, facing, limit, sideLimit)
+        if key not in self.views:
+            rays = self.rays[cell]
+            if facing in self.vectors:
+                front = frozenset(rays[facing][:limit])
+                side = frozenset(c for direction in self.sides[facing] for c in rays[direction][:sideLimit])
+            else:
+                front = frozenset(c for direction in self.vectors for c in rays[direction][:limit])
+                side = frozenset()
+            self.views[key] = (front, side)
+        return self.views[key]
+
+def rayIndex(state):
+    # Returns the RayIndex of the layout of state. It is only built
+    # when first needed, and kept with the layout's wall index.
+
+    walls = wallIndex(state)
+    if walls.rays is None:
+        walls.rays = RayIndex(state.getWalls())
+    return walls.rays
+
+def capsuleIndex(state):
+    # Returns a CellIndex of the capsules in state. There are only ever
+    # a few, so this is just built from the list.
+
+    return CellIndex(list(state.getCapsules()), state.getWalls().height)
+
+class Observation:
+    # Everything Pacman can sense in one state. Nothing is worked out
+    # until it is asked for, and then only once. What it gives out is
+    # never changed afterwards: sequences are tuples, and sets are
+    # frozensets.
+    #
+    # As well as what the sensing functions above return, it has the
+    # food, capsules and ghosts that can be seen, as visible() would
+    # give them (that is all of them unless partialVisibility is on),
+    # and the ghosts that can be heard, as audible() would.
+
+    def __init__(self, state):
+        self.state = state
+        self.views = {}
+
+    def view(self, name, build):
+        if name not in self.views:
+            self.views[name] = build()
+        return self.views[name]
+
+    def position(self):
+        return self.view('position', self.state.getPacmanPosition)
+
+    def legal(self):
+        return self.view('legal', lambda: tuple(self.state.getLegalPacmanActions()))
+
+    def ghosts(self):
+        return self.view('ghosts', lambda: tuple(self.state.getGhostPositions()))
+
+    def ghostStatesWithTimes(self):
+        return self.view('ghostStatesWithTimes', lambda: tuple((s.getPosition(), s.scaredTimer)
+                                                               for s in self.state.getGhostStates()))
+
+    def ghostStates(self):
+        return self.view('ghostStates', lambda: tuple((position, int(timer > 0))
+                                                      for position, timer in self.ghostStatesWithTimes()))
+
+    def capsuleIndex(self):
+        return self.view('capsuleIndex', lambda: capsuleIndex(self.state))
+
+    def capsules(self):
+        return self.view('capsules', lambda: tuple(self.capsuleIndex().list))
+
+    def foodIndex(self):
+        return self.view('foodIndex', lambda: foodIndex(self.state))
+
+    def food(self):
+        return self.view('food', lambda: tuple(self.foodIndex().list))
+
+    def foodSet(self):
+        return self.foodIndex().set
+
+    def foodBits(self):
+        return self.foodIndex().bits
+
+    def wallIndex(self):
+        return self.view('wallIndex', lambda: wallIndex(self.state))
+
+    def walls(self):
+        return self.view('walls', lambda: tuple(self.wallIndex().list))
+
+    def wallSet(self):
+        return self.wallIndex().set
+
+    def wallBits(self):
+        return self.wallIndex().bits
+
+    def corners(self):
+        return self.view('corners', lambda: tuple(self.wallIndex().corners))
+
+    def visibleFood(self):
+        return self.view('visibleFood', lambda: tuple(visible(list(self.food()), self.state)))
+
+    def visibleCapsules(self):
+        return self.view('visibleCapsules', lambda: tuple(visible(list(self.capsules()), self.state)))
+
+    def visibleGhosts(self):
+        return self.view('visibleGhosts', lambda: tuple(visible(list(self.ghosts()), self.state)))
+
+    def audibleGhosts(self):
+        return self.view('audibleGhosts', lambda: tuple(audible(list(self.ghosts()), self.state)))
+
+    def foodArray(self):
+        index = self.foodIndex()
+        if index.array is None:
+            index.array = readOnly(gridArray(self.state.getFood(), bool))
+        return index.array
+
+    def wallArray(self):
+        index = self.wallIndex()
+        if index.array is None:
+            index.array = readOnly(gridArray(self.state.getWalls(), bool))
+        return index.array
+
+    def capsuleArray(self):
+        def build():
+            walls = self.wallArray()
+            capsules = np.zeros(walls.shape, dtype=bool)
+            for (x, y) in self.capsules():
+                capsules[x, y] = True
+            return readOnly(capsules)
+        return self.view('capsuleArray', build)
+
+    def ghostArray(self):
+        def build():
+            walls = self.wallArray()
+            ghosts = np.zeros(walls.shape, dtype=int)
+            for (x, y) in self.ghosts():
+                ghosts[int(x), int(y)] += 1
+            return readOnly(ghosts)
+        return self.view('ghostArray', build)
+
+def gridArray(grid, dtype):
+    # A game.Grid as an array shaped (width, height). The grid keeps a
+    # list for each x, so NumPy can read it as it is.
+
+    if np is None:
+        raise Exception("The array sensors need NumPy, which is not installed")
+    return np.array(grid.data, dtype=dtype)
+
+def readOnly(array):
+    array.flags.writeable = False
+    return array
+
+# The last Observation made by observe()
+lastObservation = None
+
+
 def distanceLimited(objects, state, limit):
     # When passed a list of object locations, tests how far they are
     # from Pacman, and only returns the ones that are within "limit".
 
-    pacman = state.getPacmanPosition()
-    nearObjects = []
-    
-    for i in range(len(objects)):
-        if util.manhattanDistance(pacman,objects[i]) <= limit:
-            nearObjects.append(objects[i])
-
-    return nearObjects
+    return util.PointSet(objects).within(state.getPacmanPosition(), limit)
 
 def inFront(object, facing, state):
     # Returns true if the object is along the corridor in the
     # direction of the parameter "facing" before a wall gets in the
     # way.
-    
-    pacman = state.getPacmanPosition()
-    pacman_x = pacman[0]
-    pacman_y = pacman[1]
-    wallList = walls(state)
-
-    # If Pacman is facing North
-    if facing == Directions.NORTH:
-        # Check if the object is anywhere due North of Pacman before a
-        # wall intervenes.
-        next = (pacman_x, pacman_y + 1)
-        while not next in wallList:
-            if next == object:
-                return True
-            else:
-                next = (pacman_x, next[1] + 1)
-        return False
-
-    # If Pacman is facing South
-    if facing == Directions.SOUTH:
-        # Check if the object is anywhere due North of Pacman before a
-        # wall intervenes.
-        next = (pacman_x, pacman_y - 1)
-        while not next in wallList:
-            if next == object:
-                return True
-            else:
-                next = (pacman_x, next[1] - 1)
-        return False
+    #
+    # The corridor is looked up in the ray index (see rayIndex()
+    # below) rather than walked.
 
-    # If Pacman is facing East
-    if facing == Directions.EAST:
-        # Check if the object is anywhere due East of Pacman before a
-        # wall intervenes.
-        next = (pacman_x + 1, pacman_y)
-        while not next in wallList:
-            if next == object:
-                return True
-            else:
-                next = (next[0] + 1, pacman_y)
-        return False
-    
-    # If Pacman is facing West
-    if facing == Directions.WEST:
-        # Check if the object is anywhere due West of Pacman before a
-        # wall intervenes.
-        next = (pacman_x - 1, pacman_y)
-        while not next in wallList:
-            if next == object:
-                return True
-            else:
-                next = (next[0] - 1, pacman_y)
+    pacman = state.getPacmanPosition()
+    if facing not in RayIndex.vectors:
         return False
+    return object in rayIndex(state).ray(pacman, facing)
 
 def atSide(object, facing, state):
     # Returns true if the object is in a side corridor perpendicular
@@ -359,47 +708,21 @@ def visible(objects, state):
     # of the members of objects.
     else:
         facing = state.getPacmanState().configuration.direction
-        visibleObjects = []
-        sideObjects = []
-        
-        if facing != Directions.STOP:
-            
-            # If Pacman is moving, visible objects are those in front of,
-            # and to the side (if there are any side corridors).
-            
-            # Objects in front. Visible up to "visibilityLimit"
-            for i in range(len(objects)):
-                if inFront(objects[i], facing, state):
-                    visibleObjects.append(objects[i])
-            visibleObjects = distanceLimited(visibleObjects, state, visibilityLimit)
-            
-            # Objects to the side. Visible up to "sideLimit"
-            for i in range(len(objects)):
-                if atSide(objects[i], facing, state):
-                    sideObjects.append(objects[i])
-            sideObjects = distanceLimited(sideObjects, state, sideLimit)
-
-            # Combine lists.
-            visibleObjects = visibleObjects + sideObjects
-        
-        else:
+        pacman = state.getPacmanPosition()
 
-            # If Pacman is not moving, they can see in all directions.
-            #
-            # Unfortunately facing will never have value Directions.STOP
-            # after the first move is made, so this code will not run
-            # after the first move :-(
-
-            for i in range(len(objects)):
-                if inFront(objects[i], Directions.NORTH, state):
-                    visibleObjects.append(objects[i])
-                if inFront(objects[i], Directions.SOUTH, state):
-                    visibleObjects.append(objects[i])
-                if inFront(objects[i], Directions.EAST, state):
-                    visibleObjects.append(objects[i])
-                if inFront(objects[i], Directions.WEST, state):
-                    visibleObjects.append(objects[i])
-            visibleObjects = distanceLimited(visibleObjects, state, visibilityLimit)
+        # If Pacman is moving, visible objects are those in front of,
+        # up to "visibilityLimit", and to the side (if there are any
+        # side corridors), up to "sideLimit", in that order.
+        #
+        # If Pacman is not moving, they can see in all directions, up
+        # to "visibilityLimit".
+        #
+        # Unfortunately facing will never have value Directions.STOP
+        # after the first move is made, so that will not happen after
+        # the first move :-(
+        front, side = rayIndex(state).view(pacman, facing, visibilityLimit, sideLimit)
+        visibleObjects = [object for object in objects if object in front]
+        visibleObjects += [object for object in objects if object in side]
         return visibleObjects
 
 def audible(ghosts, state):
@@ -415,13 +738,13 @@ def union(a, b):
     #
     return list(set(a) | set(b))
 
-def selectNewMove(direction, legal):
+def selectNewMove(direction, legal, state=None):
     # This function is called if Pacman isn't moving in the specified
     # direction. Need to pick another legal action.
 
     # Pick with 50% probability between the two perpendicular
     # possibilities.
-    sample = random()
+    sample = randomStreams.stream(state, "motion").random()
     if sample <= 0.5:
         left = True
     else:
@@ -383,6 +383,9 @@ class GameStateData:
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self.streams = prevState.streams
+        else:
+            self.streams = None
 
         self._foodEaten = None
         self._foodAdded = None
@@ -16,7 +16,8 @@ from game import Agent
 from game import Actions
 from game import Directions
 import random
-from util import manhattanDistance
+import randomStreams
+from util import manhattanDistances
 import util
 
 class GhostAgent( Agent ):
@@ -28,7 +29,7 @@ class GhostAgent( Agent ):
         if len(dist) == 0:
             return Directions.STOP
         else:
-            return util.chooseFromDistribution( dist )
+            return util.chooseFromDistribution( dist, randomStreams.stream( state, 'ghost%d' % self.index ) )
 
     def getDistribution(self, state):
         "Returns a Counter encoding a distribution over actions from the provided state."
@@ -64,7 +65,7 @@ class DirectionalGhost( GhostAgent ):
         pacmanPosition = state.getPacmanPosition()
 
         # Select best actions given the state
-        distancesToPacman = [manhattanDistance( pos, pacmanPosition ) for pos in newPositions]
+        distancesToPacman = manhattanDistances( pacmanPosition, newPositions )
         if isScared:
             bestScore = max( distancesToPacman )
             bestProb = self.prob_scaredFlee
@@ -235,7 +235,7 @@ class MyGreedyAgent2(Agent):
         #Pacman Y postion
         y = pacman[1]
         # Random choice between the legal options.              
-        nextChoice = api.makeMove(random.choice(legal), legal)
+        nextChoice = api.makeMove(random.choice(legal), legal, state)
         # Predict next move if moving east by...
         if nextChoice == Directions.EAST:
             #... adding 1 to current X postion of pacman
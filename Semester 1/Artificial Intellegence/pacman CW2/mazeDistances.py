@@ -0,0 +1,186 @@
+# mazeDistances.py
+# robinson/09-dec-2018
+#
+# True distances through the maze, rather than util.manhattanDistance,
+# which goes straight through walls.
+#
+# For each layout the distance between every pair of free cells is
+# worked out once, by a breadth-first search from each cell, and kept
+# as a table of 16-bit numbers: the distance from the i-th free cell to
+# the j-th is entry i*n + j, with the free cells numbered by x, then by
+# y. The table is written to disk under the hash of the layout's walls,
+# and read back, memory-mapped if NumPy is there, by any later game or
+# process that plays the same layout, so only the first ever pays for
+# the searches:
+#
+# distances = mazeDistances.load(state.getWalls())
+# distances.distance((1, 1), (18, 9))
+#
+# api.mazeDistance(a, b, state) does the same for the layout of state.
+#
+# As required by the licensing agreement for the PacMan AI we have:
+#
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+from array import array
+from collections import deque
+import math
+import mdpEngines
+import os
+import tempfile
+
+# NumPy is optional. Without it the table is read into memory rather
+# than mapped.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Where the tables are kept, unless load() is told otherwise
+directory = os.path.join(tempfile.gettempdir(), "pacmanMazeDistances")
+
+# The distance given between cells that can't reach each other
+unreachable = 65535
+
+class MazeDistances:
+
+    def __init__(self, walls, table=None):
+        self.width = walls.width
+        self.height = walls.height
+        self.cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        self.index = dict((cell, i) for i, cell in enumerate(self.cells))
+        self.size = len(self.cells)
+        # The layout's name, as the other caches on disk know it. This
+        # has width, height and walls, which is all layoutHash needs.
+        self.walls = [(x, y) for x in range(walls.width) for y in range(walls.height) if walls[x][y]]
+        self.hash = mdpEngines.layoutHash(self)
+        self.table = table
+
+    # Fill the table in, by a breadth-first search from every cell.
+    def compute(self):
+        n = self.size
+        table = array('H', [unreachable]) * (n * n)
+        neighbours = []
+        for (x, y) in self.cells:
+            neighbours.append([self.index[next] for next in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]
+                               if next in self.index])
+        for start in range(n):
+            row = start * n
+            table[row + start] = 0
+            queue = deque([start])
+            while queue:
+                i = queue.popleft()
+                d = table[row + i] + 1
+                for j in neighbours[i]:
+                    if table[row + j] == unreachable:
+                        table[row + j] = d
+                        queue.append(j)
+        self.table = table
+
+    def path(self, directory):
+        return os.path.join(directory, self.hash + ".u16")
+
+    # Write the table to directory. It goes to a file of its own first,
+    # and is then renamed, so that another process reading it never
+    # sees half of it.
+    def save(self, directory):
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                pass
+        temporary = "%s.%d" % (self.path(directory), os.getpid())
+        f = open(temporary, 'wb')
+        array('H', self.table).tofile(f)
+        f.close()
+        os.rename(temporary, self.path(directory))
+
+    # Read the table back from directory, if it is there and the right
+    # size. Returns whether it was.
+    def read(self, directory):
+        path = self.path(directory)
+        entries = self.size * self.size
+        if not os.path.exists(path) or os.path.getsize(path) != 2 * entries:
+            return False
+        if np is not None:
+            self.table = np.memmap(path, dtype=np.uint16, mode='r', shape=(entries,))
+        else:
+            table = array('H')
+            f = open(path, 'rb')
+            table.fromfile(f, entries)
+            f.close()
+            self.table = table
+        return True
+
+    # The distance between free cells a and b. Ghosts can be half way
+    # between cells, so positions that aren't whole numbers count from
+    # whichever of the cells either side of them is closer.
+    def distance(self, a, b):
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is not None and j is not None:
+            return int(self.table[i * self.size + j])
+        best = unreachable
+        for cellA, offsetA in self.nearCells(a):
+            for cellB, offsetB in self.nearCells(b):
+                d = int(self.table[self.index[cellA] * self.size + self.index[cellB]])
+                if d != unreachable:
+                    best = min(best, d + offsetA + offsetB)
+        return best
+
+    # The distances from a to each of points, as a list. When they are
+    # all free cells, they are read from a's row of the table in one
+    # go.
+    def distances(self, a, points):
+        i = self.index.get(a)
+        indexes = [self.index.get(point) for point in points]
+        if i is None or None in indexes:
+            return [self.distance(a, point) for point in points]
+        row = self.row(a)
+        if np is not None:
+            return np.asarray(row)[indexes].tolist()
+        return [row[j] for j in indexes]
+
+    # The free cells next to position, and how far it is from each.
+    def nearCells(self, position):
+        x, y = position
+        xs = set([int(math.floor(x)), int(math.ceil(x))])
+        ys = set([int(math.floor(y)), int(math.ceil(y))])
+        return [((cx, cy), abs(x - cx) + abs(y - cy)) for cx in xs for cy in ys
+                if (cx, cy) in self.index]
+
+    # The distances from free cell a to every free cell, in the order of
+    # cells.
+    def row(self, a):
+        i = self.index[a]
+        return self.table[i * self.size:(i + 1) * self.size]
+
+# Tables already loaded by this process, by layout hash
+loaded = {}
+
+def load(walls, path=None):
+    # Returns the MazeDistances for the layout with walls (a game.Grid),
+    # from this process if it has had them already, otherwise from disk,
+    # otherwise worked out and saved for next time.
+    if path is None:
+        path = directory
+    distances = MazeDistances(walls)
+    if distances.hash in loaded:
+        return loaded[distances.hash]
+    if not distances.read(path):
+        distances.compute()
+        try:
+            distances.save(path)
+        except (IOError, OSError):
+            print "Could not save the maze distances in", path
+    loaded[distances.hash] = distances
+    return distances
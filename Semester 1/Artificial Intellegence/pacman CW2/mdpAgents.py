@@ -28,104 +28,416 @@
 # Parsons, based on the code in pacmanAgents.py
 
 from pacman import Directions
+from pacman import ClassicGameRules
 from game import Agent
 import api
 import random
 import game
 import util
 import sys
+import threading
+import mdpEngines
 
 #
-# A class that creates a grid that can be used as a map
+# A board model made of bitplanes.
 #
-# The map itself is implemented as a nested list, and the interface
-# allows it to be accessed by specifying x, y locations.
+# Each cell of the board has one byte, and each kind of thing that can
+# be in a cell has a bit of that byte: a wall, food, a capsule, a
+# ghost, or the fact that Pacman has been there. Cells are numbered
+# x * height + y, so setting or testing any of these takes the same
+# time however big the board is.
 #
-class Grid:
-         
+# Food and capsules stay on the board once they have been seen;
+# Pacman having visited their cell is what says they have been eaten.
+#
+class Board:
+
+    # The planes
+    WALL = 1
+    FOOD = 2
+    CAPSULE = 4
+    VISITED = 8
+    GHOST = 16
+
     # Constructor
     #
     # Note that it creates variables:
     #
-    # grid:   an array that has one position for each element in the grid.
-    # width:  the width of the grid
-    # height: the height of the grid
-    #
-    # Grid elements are not restricted, so you can place whatever you
-    # like at each location. You just have to be careful how you
-    # handle the elements when you use them.
+    # planes:  a bytearray with one byte for each cell of the board.
+    # width:   the width of the board
+    # height:  the height of the board
+    # corners: the four corners of the board
+    # ghosts:  the cells that have the ghost bit set
     def __init__(self, width, height):
         self.width = width
         self.height = height
-        subgrid = []
-        for i in range(self.height):
-            row=[]
-            for j in range(self.width):
-                row.append(0)
-            subgrid.append(row)
-
-        self.grid = subgrid
-
-    # Print the grid out.
-    def display(self):       
-        for i in range(self.height):
-            for j in range(self.width):
-                # print grid elements with no newline
-                print self.grid[i][j],
-            # A new line after each line of the grid
-            print 
-        # A line after the grid
+        self.planes = bytearray(width * height)
+        self.corners = [(0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)]
+        self.ghosts = []
+
+    # Set, clear and test a plane's bit for the cell at x, y.
+    def set(self, plane, x, y):
+        self.planes[x * self.height + y] |= plane
+
+    def clear(self, plane, x, y):
+        self.planes[x * self.height + y] &= ~plane
+
+    def test(self, plane, x, y):
+        return self.planes[x * self.height + y] & plane != 0
+
+    # Bring the board up to date with a new state. Only what can have
+    # changed since the last state is touched: the cell Pacman is on,
+    # anything the engine says he ate on his last move (_foodEaten and
+    # _capsuleEaten, which it only records when _agentMoved is Pacman),
+    # and the cells of the ghosts.
+    def update(self, state):
+        data = state.data
+        if data._agentMoved == 0:
+            for eaten in [data._foodEaten, data._capsuleEaten]:
+                if eaten is not None:
+                    self.set(self.VISITED, eaten[0], eaten[1])
+        x, y = api.whereAmI(state)
+        self.set(self.VISITED, x, y)
+
+        for (x, y) in self.ghosts:
+            self.clear(self.GHOST, x, y)
+        self.ghosts = [(int(x), int(y)) for (x, y) in api.ghosts(state)]
+        for (x, y) in self.ghosts:
+            self.set(self.GHOST, x, y)
+
+    # The value of every cell, keyed by (x, y): food for food and
+    # capsule for a capsule, unless they have been eaten (-1 and -2),
+    # ghost where there is a ghost and -1 for any other free cell. Walls
+    # are "%", and the corners "$".
+    def values(self, food=3, capsule=9, ghost=-10):
+        values = {}
+        planes = self.planes
+        height = self.height
+        for x in range(self.width):
+            for y in range(height):
+                cell = planes[x * height + y]
+                if cell & self.WALL:
+                    value = "%"
+                elif cell & self.GHOST:
+                    value = ghost
+                elif cell & self.FOOD:
+                    if cell & self.VISITED:
+                        value = -1
+                    else:
+                        value = food
+                elif cell & self.CAPSULE:
+                    if cell & self.VISITED:
+                        value = -2
+                    else:
+                        value = capsule
+                else:
+                    value = -1
+                values[(x, y)] = value
+        for corner in self.corners:
+            values[corner] = "$"
+        return values
+
+    # What to print for the cell at x, y: its value from values if that
+    # is given, otherwise a symbol for what is there. Walls are always
+    # "%".
+    def symbol(self, x, y, values):
+        cell = self.planes[x * self.height + y]
+        if cell & self.WALL:
+            return "%"
+        if values is not None:
+            return values[(x, y)]
+        if cell & self.FOOD and not cell & self.VISITED:
+            return "*"
+        if cell & self.CAPSULE and not cell & self.VISITED:
+            return "&"
+        return " "
+
+    # Print the board out, upside down.
+    def display(self, values=None):
+        for y in range(self.height):
+            for x in range(self.width):
+                # print elements with no newline
+                print self.symbol(x, y, values),
+            # A new line after each line of the board
+            print
+        # A line after the board
         print
 
-    # The display function prints the grid out upside down. This
-    # prints the grid out so that it matches the view we see when we
+    # The display function prints the board out upside down. This
+    # prints the board out so that it matches the view we see when we
     # look at Pacman.
-    def prettyDisplay(self):       
-        for i in range(self.height):
-            for j in range(self.width):
-                # print grid elements with no newline
-                print self.grid[self.height - (i + 1)][j],
-            # A new line after each line of the grid
-            print 
-        # A line after the grid
+    def prettyDisplay(self, values=None):
+        for y in range(self.height - 1, -1, -1):
+            for x in range(self.width):
+                # print elements with no newline
+                print self.symbol(x, y, values),
+            # A new line after each line of the board
+            print
+        # A line after the board
         print
-        
-    # Set and get the values of specific elements in the grid.
-    # Here x and y are indices.
-    def setValue(self, x, y, value):
-        self.grid[y][x] = value
-
-    def getValue(self, x, y):
-        return self.grid[y][x]
-
-    def setScore(self, x, y, value, score):
-        self.grid[y][x] = value
-        self.value = score
-    def getScore(self):
-        return self.value
 
     # Return width and height to support functions that manipulate the
-    # values stored in the grid.
+    # board.
     def getHeight(self):
         return self.height
 
     def getWidth(self):
         return self.width
 
+# Options given with -a arrive as strings, or as 1 when just the
+# name is given (see parseAgentArgs in pacman.py), so turn them into
+# something we can test.
+def isTrue(option):
+    return str(option).lower() in ["1", "true", "yes", "on"]
+
+# The same for numbers, keeping whole numbers as ints.
+def toNumber(option):
+    try:
+        return int(str(option))
+    except ValueError:
+        return float(option)
+
 #
 # An agent that creates a map. Assigns Utilities, calculates MEU, applies Bellman, recalculates MEU.
 class MDPAgent(Agent):
 
     # The constructor
-    def __init__(self):
+    #
+    # backend picks how value iteration is run: "python" does the sweeps
+    # cell by cell over the mapValues dictionary, "numpy" hands them to
+    # the array engine in mdpEngines.py. Both make the same decisions.
+    # Select with, for example:
+    #
+    # python pacman.py -p MDPAgent -a backend=numpy
+    #
+    # By default value iteration runs a fixed 50 sweeps. Giving epsilon
+    # makes it stop instead as soon as no utility changes by more than
+    # epsilon in a sweep, with maxLoops as a safety limit. inPlace
+    # updates utilities as soon as they are computed (Gauss-Seidel)
+    # rather than from a copy of the last sweep (Jacobi), which gets
+    # there in fewer sweeps:
+    #
+    # python pacman.py -p MDPAgent -a epsilon=0.001,inPlace
+    #
+    # warmStart keeps the utilities from one move to the next. Between
+    # moves only a pellet or two and the ghosts change, so rather than
+    # solving from scratch we start from the last answer and only redo
+    # the cells near a reward that changed. This needs a convergence
+    # test, so epsilon defaults to 0.001 when warmStart is on.
+    #
+    # solver=policy uses policy iteration instead of value iteration,
+    # which needs far fewer passes on big boards. Each policy is
+    # evaluated exactly (with SciPy if it is there), or, if
+    # evaluationSweeps is given, with just that many sweeps:
+    #
+    # python pacman.py -p MDPAgent -a solver=policy,evaluationSweeps=5
+    #
+    # solver=prioritized uses prioritized sweeping: rather than sweeping
+    # the board, it keeps backing up whichever cell is furthest from
+    # its Bellman equation until none is off by epsilon or more.
+    #
+    # solver=hierarchical only runs value iteration on the junctions of
+    # the maze, and works out the corridors between them directly, which
+    # is far less work on boards like bigMaze:
+    #
+    # python pacman.py -p MDPAgent -l bigMaze -a solver=hierarchical
+    #
+    # solver=tiled cuts the board into tiles tileSize cells across and
+    # runs value iteration on them in parallel, in a pool of processes
+    # (one per CPU unless processes is given), each doing tileSweeps
+    # sweeps on its tile between swaps of the values on the tile edges:
+    #
+    # python pacman.py -p MDPAgent -l bigMaze -a solver=tiled,tileSize=12,processes=4
+    #
+    # window=R only solves the MDP for cells within R steps of Pacman,
+    # so the time per move doesn't grow with the size of the board.
+    # windowMetric says how steps are counted, "manhattan" or "maze"
+    # (along corridors). Cells just outside the window are valued by
+    # how much food there is near them:
+    #
+    # python pacman.py -p MDPAgent -l bigMaze -a window=6,windowMetric=maze
+    #
+    # cache=N keeps the utilities of up to N solved positions (layout,
+    # food and capsules) from one game to the next, so that with -n the
+    # later games warm start from the earlier ones, even on their first
+    # move. It turns warmStart on. With cacheFile the cache is also kept
+    # on disk between runs:
+    #
+    # python pacman.py -p MDPAgent -n 100 -q -a cache=256,cacheFile=mdp.cache
+    #
+    # budget=F makes whichever solver is in use stop once a fraction F of
+    # the time the game allows for a move has gone, and play the best
+    # move it has found by then. The time allowed is the smaller of
+    # ClassicGameRules' move warning time and move timeout, for the
+    # timeout given here, which should match --timeout. How often the
+    # time ran out is printed at the end of each game:
+    #
+    # python pacman.py -p MDPAgent -l bigMaze -c --timeout 1 -a budget=0.5,timeout=1
+    #
+    # background starts solving for the next move, in a thread, as soon
+    # as this one is chosen, assuming the ghosts stay put. When the next
+    # move comes, that is stopped and used as a warm start, so only the
+    # cells near where the ghosts actually went need redoing. It turns
+    # warmStart on.
+    #
+    # threat=P takes a penalty off the reward for being near a ghost: P
+    # on the ghost's cell, falling by a factor of threatDecay with each
+    # step away along the corridors, out to threatRadius steps. Scared
+    # ghosts count as further away the longer they will stay scared:
+    #
+    # python pacman.py -p MDPAgent -a threat=1,threatDecay=0.5,threatRadius=5
+    #
+    # policyTable=FILE plays from a policy compiled by mdpCompiler.py
+    # whenever there are no ghosts, and only solves on the moves the
+    # table doesn't cover. The table is ignored if it was compiled for
+    # another layout or other rewards:
+    #
+    # python mdpCompiler.py -l mediumClassicNoGhosts -o medium.policy
+    # python pacman.py -p MDPAgent -l mediumClassicNoGhosts -a policyTable=medium.policy
+    #
+    # stats=FILE times each part of every move (waiting for the
+    # background planner, printing the map, building the map values,
+    # solving and picking the action), counts the sweeps and backups,
+    # and works out how far from solved the utilities were left. A
+    # summary is printed at the end of each game, and the figures for
+    # each game and for all of them so far are written to FILE, as CSV
+    # if it ends in .csv and as JSON otherwise. showMap=False stops the
+    # map being printed on every move, which otherwise takes most of
+    # the time:
+    #
+    # python pacman.py -p MDPAgent -q -n 10 -a stats=stats.json,showMap=False
+    #
+    # foodReward, capsuleReward and ghostReward are the utilities of
+    # cells with food, a capsule or a ghost, reward is the reward for
+    # being in any other cell and discount the discount. mdpSweep.py
+    # tries out combinations of them:
+    #
+    # python pacman.py -p MDPAgent -a foodReward=5,ghostReward=-50,discount=0.9
+    def __init__(self, backend="python", epsilon=None, inPlace=False, maxLoops=1000, warmStart=False,
+                 solver="value", evaluationSweeps=None, window=None, windowMetric="manhattan",
+                 cache=None, cacheFile=None, budget=None, timeout=30, tileSize=16, processes=None, tileSweeps=4,
+                 background=False, threat=None, threatDecay=0.5, threatRadius=5, policyTable=None,
+                 stats=None, showMap=True, foodReward=3, capsuleReward=9, ghostReward=-10, reward=.2, discount=.8):
         print "Running init!"
 
-        #Store values
-        self.seen = []
-        self.mapForFood = []
-        self.mapForCap = []
-        self.mapForCorners =[]
-        self.mapForWall = []
+        #The rewards, and the discount
+        self.foodReward = toNumber(foodReward)
+        self.capsuleReward = toNumber(capsuleReward)
+        self.ghostReward = toNumber(ghostReward)
+        self.reward = toNumber(reward)
+        self.discount = toNumber(discount)
+
+        #Values shown on the map at the start of each move
+        self.shownValues = None
+
+        #Fall back to plain Python if NumPy isn't installed
+        if backend == "numpy" and not mdpEngines.numpyAvailable():
+            print "NumPy not available, using the python backend"
+            backend = "python"
+        if backend not in ["python", "numpy"]:
+            raise Exception("Unknown MDPAgent backend: " + str(backend))
+        self.backend = backend
+        self.engine = None
+
+        #How value iteration decides it is done
+        if epsilon is not None:
+            epsilon = float(epsilon)
+        self.epsilon = epsilon
+        self.inPlace = isTrue(inPlace)
+        self.maxLoops = int(maxLoops)
+        self.warmStart = isTrue(warmStart)
+
+        #Solved utilities kept across games
+        self.cache = None
+        self.cacheKey = None
+        if cache is not None or cacheFile is not None:
+            if cache is None:
+                cache = 256
+            self.cache = mdpEngines.UtilityCache(int(cache), cacheFile)
+            self.warmStart = True
+
+        #Planning ahead while the ghosts move
+        self.background = isTrue(background)
+        if self.background:
+            self.warmStart = True
+        self.planner = None
+        self.plannerDeadline = None
+        self.plansFinished = 0
+        self.plansStarted = 0
+
+        if self.warmStart and self.epsilon is None:
+            self.epsilon = 0.001
+
+        #Time allowed for solving each move, if limited. Solving runs to
+        #convergence within it, so this needs epsilon too.
+        self.budget = None
+        if budget is not None:
+            rules = ClassicGameRules(int(timeout))
+            self.budget = float(budget) * min(rules.getMoveWarningTime(0), rules.getMoveTimeout(0))
+            if self.epsilon is None:
+                self.epsilon = 0.001
+        self.deadline = None
+        self.deadlineHits = 0
+        self.moves = 0
+        #Number of sweeps, and of single cell backups, used on the last move
+        self.sweeps = 0
+        self.backups = 0
+
+        #Utilities and terminal rewards from the last move, for warmStart,
+        #and whether solving them ran to the end or was stopped by a deadline
+        self.utilities = None
+        self.lastRewards = {}
+        self.lastCellRewards = None
+        self.converged = True
+
+        #Which solver to use
+        if solver not in ["value", "policy", "prioritized", "hierarchical", "tiled"]:
+            raise Exception("Unknown MDPAgent solver: " + str(solver))
+        self.solver = solver
+        if evaluationSweeps is not None:
+            evaluationSweeps = int(evaluationSweeps)
+        self.evaluationSweeps = evaluationSweeps
+        self.policy = None
+
+        #How to split the board up for solver=tiled
+        self.tileSize = int(tileSize)
+        if processes is not None:
+            processes = int(processes)
+        self.processes = processes
+        self.tileSweeps = int(tileSweeps)
+        self.tileSolver = None
+
+        #Penalty for being near a ghost, if any
+        if threat is not None:
+            threat = float(threat)
+        self.threatPenalty = threat
+        self.threatDecay = float(threatDecay)
+        self.threatRadius = int(threatRadius)
+        self.threat = None
+
+        #Size and shape of the window to solve in, if any
+        if window is not None:
+            window = int(window)
+        self.windowRadius = window
+        self.windowMetric = windowMetric
+        self.window = None
+
+        #Compiled policy to play from, if any, and how often it had the move.
+        #It is read once, and checked against the layout of each game.
+        self.compiledTable = None
+        if policyTable is not None:
+            self.compiledTable = mdpEngines.loadPolicyTable(policyTable)
+        self.policyTable = None
+        self.tableHits = 0
+        self.tableMisses = 0
+
+        #Timing and other figures for each move, if wanted
+        self.showMap = isTrue(showMap)
+        self.statsFile = stats
+        self.stats = None
+        if stats is not None:
+            self.stats = mdpEngines.MoveStatistics()
+        self.solved = None
     
 
     # This function is run when the agent is created, and it has access
@@ -135,28 +447,93 @@ class MDPAgent(Agent):
          # Make a map of the right size
          self.makeMap(state)
          self.addWallsToMap(state)
-         self.updateFoodInMap(state)
-         self.map.display()
+         self.addFoodToMap(state)
+         if self.showMap:
+             self.map.display()
+         # The motion model only depends on the walls, so its tables are
+         # built once per game, as is the array engine that uses them
+         self.model = mdpEngines.TransitionModel(self.map.getWidth(), self.map.getHeight(), api.walls(state))
+         if self.backend == "numpy":
+             self.engine = mdpEngines.ArrayEngine(self.model)
+         if self.solver == "policy":
+             self.policySolver = mdpEngines.PolicyIteration(self.model)
+         if self.solver == "prioritized":
+             self.prioritySolver = mdpEngines.PrioritizedSweeping(self.model)
+         if self.solver == "hierarchical":
+             self.hierarchySolver = mdpEngines.HierarchicalIteration(self.model)
+         if self.solver == "tiled":
+             if self.tileSolver is not None:
+                 self.tileSolver.close()
+             self.tileSolver = mdpEngines.TiledIteration(self.model, self.tileSize, self.processes)
+         # The heuristic for the edge of the window uses the same rewards as
+         # createMapValues and getAction
+         if self.windowRadius is not None:
+             self.window = mdpEngines.LocalWindow(self.model, self.windowRadius, self.windowMetric)
+             self.window.buildHeuristic(api.food(state), self.foodReward, self.reward, self.discount)
+         if self.threatPenalty is not None:
+             self.threat = mdpEngines.ThreatField(self.model, self.threatPenalty, self.threatDecay, self.threatRadius)
+         # Cached utilities are only any use with the same rewards, so
+         # those go in the key along with the layout
+         if self.cache is not None:
+             self.layoutHash = (mdpEngines.layoutHash(self.model), tuple(sorted(self.rewardParameters().items())))
+         self.policyTable = None
+         if self.compiledTable is not None:
+             if self.compiledTable.matches(mdpEngines.layoutHash(self.model), self.rewardParameters()):
+                 self.policyTable = self.compiledTable
+             else:
+                 print "The policy table is for another layout or other rewards, not using it"
+         self.utilities = None
+         self.policy = None
+         self.lastRewards = {}
+         self.lastCellRewards = None
 
     # This is what gets run when the game ends.
     def final(self, state):
 
+        self.stopPlanning()
         print "Game Over"
         #Reset values for next game
-        self.seen = []
-        self.mapForFood = []
-        self.mapForCap = []
-        self.mapForWall = []
+        self.shownValues = None
+        self.utilities = None
+        self.lastRewards = {}
+        self.lastCellRewards = None
+        self.policy = None
+        if self.budget is not None:
+            print "Ran out of time on", self.deadlineHits, "of", self.moves, "moves"
+        self.deadlineHits = 0
+        self.moves = 0
+        if self.background:
+            print "Planned ahead for", self.plansStarted, "moves, finished", self.plansFinished, "in time"
+        self.plansStarted = 0
+        self.plansFinished = 0
+        if self.policyTable is not None:
+            print "Policy table:", self.tableHits, "hits,", self.tableMisses, "misses"
+        self.tableHits = 0
+        self.tableMisses = 0
+        if self.stats is not None:
+            summary = self.stats.endGame(state.getScore(), state.isWin())
+            print "Seconds per move:", ", ".join("%s %.5f" % (phase, summary[phase + 'Mean'])
+                                                 for phase in self.stats.phases)
+            print "Sweeps:", summary['sweeps'], "backups:", summary['backups'], "largest residual:", summary['maxResidual']
+            self.stats.save(self.statsFile)
+        #Shut down the worker processes
+        if self.tileSolver is not None:
+            self.tileSolver.close()
+            self.tileSolver = None
+        #The cache is kept, so the next game can use it
+        if self.cache is not None:
+            print "Utility cache:", self.cache.hits, "hits,", self.cache.misses, "misses"
+            self.cache.save()
         
 
 
-    # Make a map by creating a grid of the right size
+    # Make a map by creating a board of the right size
     def makeMap(self,state):
         corners = api.corners(state)
         print corners
         height = self.getLayoutHeight(corners)
         width  = self.getLayoutWidth(corners)
-        self.map = Grid(width, height)
+        self.map = Board(width, height)
         
         
     # Functions to get the height and the width of the grid.
@@ -184,368 +561,443 @@ class MDPAgent(Agent):
     def addWallsToMap(self, state):
         walls = api.walls(state)
         for i in range(len(walls)):
-            self.map.setValue(walls[i][0], walls[i][1], '%')
+            self.map.set(Board.WALL, walls[i][0], walls[i][1])
             
 
-    # Create a map with a current picture of the food that exists.
-    def updateFoodInMap(self, state):
-        # First, make all grid elements that aren't walls blank.
-        for i in range(self.map.getWidth()):
-            for j in range(self.map.getHeight()):
-                if self.map.getValue(i, j) != '%':
-                    self.map.setValue(i, j, ' ')
-                                        
+    # Put the food and capsules into the map. They only ever get eaten
+    # after this, which the map finds out about from the moves.
+    def addFoodToMap(self, state):
         food = api.food(state)
         for i in range(len(food)):
-            self.map.setValue(food[i][0], food[i][1], '*')
+            self.map.set(Board.FOOD, food[i][0], food[i][1])
         
         capsules = api.capsules(state)
         for i in range(len(capsules)):
-            self.map.setValue(capsules[i][0], capsules[i][1], '&')
+            self.map.set(Board.CAPSULE, capsules[i][0], capsules[i][1])
 
 
     #Function to create values for each item in game, used to help pacman make decision for best route
+    #Eaten food is worth -1 and eaten capsules -2, as a reason for pacman to
+    #leave, ghosts are worth ghostReward (-10) as to avoid them, and any other cell is -1.
     def createMapValues(self,state):
-
+        self.map.update(state)
+        return self.map.values(self.foodReward, self.capsuleReward, self.ghostReward)
         
-
-        #Get items
+    #Function to turn values1 into a list of utilities by cell number, as the
+    #transition tables use. fixed marks the terminal cells, update lists the rest.
+    def cellUtilities(self, state, values1):
         food = api.food(state)
-        pacman = api.whereAmI(state)
         capsules = api.capsules(state)
-        corners = api.corners(state)
-        walls = api.walls(state)
-        ghosts = api.ghosts(state)        
-
-        #If locations not in store, add now.
-        if pacman not in self.seen:
-			self.seen.append(pacman)
-        for i in food:
-			if i not in self.mapForFood:
-				self.mapForFood.append(i)
-        for i in capsules:
-			if i not in self.mapForCap:
-				self.mapForCap.append(i)
-        for i in walls:
-			if i not in self.mapForWall:
-				self.mapForWall.append(i)
-        for i in corners:
-            if i not in self.mapForCorners:
-                self.mapForCorners.append(i)
-
-        #Create dictionary from maps created above to hold locations and assign values
-        #Making sure that there is enough of a reason for pacman to leave the game
-        self.foodDictionary = dict.fromkeys(self.mapForFood, 3)
-        self.capsuleDictionary = dict.fromkeys(self.mapForCap, 9)
-        self.wallDictionary = dict.fromkeys(self.mapForWall, "%")
-        self.cornerDictionary = dict.fromkeys(self.mapForCorners,"$")
-        
-        
-
-        #Create mapValues to store coordinates value
-        mapValues = {}
-        mapValues.update(self.foodDictionary)
-        mapValues.update(self.capsuleDictionary)
-        mapValues.update(self.wallDictionary)
-        mapValues.update(self.cornerDictionary)
-
-        #Get everything, if not in dictionaries then set to value of -1
-        for i in range(self.getLayoutWidth(corners)-1):
-			for j in range(self.getLayoutHeight(corners)-1):
-				if (i, j) not in mapValues.keys():
-					mapValues[(i, j)] = -1
-        
-        #If seen food set values to seen (0) in food map
-        for i in self.mapForFood:
-			if i in self.seen:
-				mapValues[i] = -1
-		
-        for i in self.mapForCap:
-			if i in self.seen:
-				mapValues[i] = -2
-        for i in self.mapForWall:
-            if i in self.seen:
-                mapValues[i] = 0        
-
-       # Set ghost value to -10 as to avoid them
-        for i in mapValues.keys():
-            for j in range(len(ghosts)):
-                if ((int(ghosts[j][0]), int(ghosts[j][1]))) == i:
-                    mapValues[i] = -10
-
-        return mapValues
-        
-    # Function to calculate the maximum expected utility of a coordinate on mapValues which will then be used as the transition value for value iteration
-    def calculateMEU (self, x, y, mapValues):               
-
-		# Store utility values
-        self.utilityDictionary = { "eastUtility": 0, "westUtility": 0, "northUtility": 0, "southUtility": 0}
-        self.mapValues = mapValues
-
-        self.x = x
-        self.y = y
-        # Get directions in relation to current position
-        North = (self.x, self.y + 1)
-        South = (self.x, self.y - 1)
-        East = (self.x + 1, self.y)
-        West = (self.x - 1, self.y)
-        Wait = (self.x, self.y)
-        
-
-		# If West isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-		# 
-        if self.mapValues[West] != "%":
-			westUtility = (self.mapValues[West] * 0.8)
-        else:
-			westUtility = (self.mapValues[Wait] * 0.8)
-        # If North isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[North] != "%":
-			westUtility += (self.mapValues[North] * 0.1)
-        else:
-			westUtility += (self.mapValues[Wait] * 0.1)
-        # If South isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[South] != "%":
-			westUtility += (self.mapValues[South] * 0.1)
-        else:
-			westUtility += (self.mapValues[Wait] * 0.1)
-
-        #Add utility to "westUtility" in dictionary
-        self.utilityDictionary["westUtility"] = westUtility
-        
-		# Rest of directions are treated the same...
-        # If East isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[East] != "%":
-			eastUtility = (self.mapValues[East] * 0.8)
-        else:
-			eastUtility = (self.mapValues[Wait] * 0.8)
-        # If North isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[North] != "%":
-			eastUtility += (self.mapValues[North] * 0.1)
-        else:
-			eastUtility += (self.mapValues[Wait] * 0.1)
-        # If South isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[South] != "%":
-			eastUtility += (self.mapValues[South] * 0.1)
-        else:
-			eastUtility += (self.mapValues[Wait] * 0.1)
-
-        #Add utility to "eastUtility" in dictionary
-        self.utilityDictionary["eastUtility"] = eastUtility
-
-        # If North isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[North] != "%":
-			northUtility = (self.mapValues[North] * 0.8)
-        else:
-			northUtility = (self.mapValues[Wait] * 0.8)
-        # If East isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[East] != "%":
-			northUtility += (self.mapValues[East] * 0.1)
-        else:
-			northUtility += (self.mapValues[Wait] * 0.1)
-        # If West isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[West] != "%":
-			northUtility += (self.mapValues[West] * 0.1)
-        else:
-			northUtility += (self.mapValues[Wait] * 0.1)
-
-        #Add utility to "northUtility" in dictionary
-        self.utilityDictionary["northUtility"] = northUtility
-
-        # If South isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[South] != "%":
-			southUtility = (self.mapValues[South] * 0.8)
-        else:
-			southUtility = (self.mapValues[Wait] * 0.8)
-        # If East isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[East] != "%":
-			southUtility += (self.mapValues[East] * 0.1)
-        else:
-			southUtility += (self.mapValues[Wait] * 0.1)
-        # If West isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[West] != "%":
-			southUtility += (self.mapValues[West] * 0.1)
-        else:
-			southUtility += (self.mapValues[Wait] * 0.1)
-
-        #Add utility to "southUtility" in dictionary
-        self.utilityDictionary["southUtility"] = southUtility
-		
+        ghosts = api.ghosts(state)
 
-		# Take the max value and make it MEU then return updated mapValues
-        self.mapValues[Wait] = max(self.utilityDictionary.values())
-        return self.mapValues[Wait]
+        #Cells that keep their reward. Ghosts only count when they are
+        #exactly on a cell.
+        terminals = set(food + capsules)
+        for ghost in ghosts:
+            if ghost[0] == int(ghost[0]) and ghost[1] == int(ghost[1]):
+                terminals.add((int(ghost[0]), int(ghost[1])))
+
+        utilities = self.model.toList(values1)
+        fixed = [False] * len(utilities)
+        for cell in terminals:
+            fixed[self.model.index[cell]] = True
+        update = [i for i in range(len(utilities)) if not fixed[i]]
+
+        #Only solve near Pacman if there is a window
+        if self.window is not None:
+            self.window.updateFood(food)
+            fixed, update = self.window.restrict(self.model.index[api.whereAmI(state)], utilities, fixed, update)
+        return utilities, fixed, update
+
+    #Function to give the reward for being in each cell, by cell number: the
+    #same everywhere, less the threat from the ghosts if that is switched on.
+    def cellRewards(self, state, reward):
+        if self.threat is None:
+            return [reward] * len(self.model.cells)
+        threat = self.threat.compute(api.ghostStatesWithTimes(state))
+        return [reward - penalty for penalty in threat]
 
     #Function to find best strategy, loop through possibilites until best action doesn't change
     def valIteration (self, state, reward, discount, values1):        
 
-        food = api.food(state)
-        capsules = api.capsules(state)
-        corners = api.corners(state)
-        walls = api.walls(state)
-        ghosts = api.ghosts(state)
+        utilities, fixed, update = self.cellUtilities(state, values1)
+        rewards = self.cellRewards(state, reward)
 
-        maxHeight = self.getLayoutWidth(corners) - 1
-        maxWidth = self.getLayoutHeight(corners) -1 
-        
-        
         #Bellman makes an appearance...
-        #Vals is copy of old values
+        #Vals is copy of old values, or the values themselves when
+        #updating in place
         #Cycle through possible outcomes
         #If space, value of this move is updated
-        loops = 50
-        while loops > 0:
-            Vals = values1.copy()
-            for i in range (maxHeight):
-                for j in range(maxWidth):
-                    if(i,j) not in food and (i,j) not in capsules and (i,j) not in walls and (i,j) not in ghosts:
-                        values1[(i,j)] = reward + discount * self.calculateMEU(i, j, Vals)
-            loops -=1
-    
-    
-
-
-    # Function to move pacman in best way possible, updating after every step
-    def getRules(self, state, valueMap):
-
-        #Get previous map and reset utility
-        self.mapValues = valueMap
-        self.utilityDictionary = {"eastUtility": 0, "westUtility": 0, "northUtility": 0, "southUtility": 0}
-        
-        
-        pacman = api.whereAmI(state)
-        x = pacman[0]
-        y = pacman[1]     
-
-        #Predict positions just as before
-        East = (x + 1, y)
-        West = (x - 1, y)
-        North = (x, y + 1)
-        South = (x, y - 1)
-        Wait = (x,y)
-
-        #Calculate utilities of directions as before
-        # If East isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[East] != "%":
-			eastUtility = (self.mapValues[East] * 0.8)
-        else:
-			eastUtility = (self.mapValues[Wait] * 0.8)
-        # If North isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still            
-        if self.mapValues[North] != "%":
-			eastUtility += (self.mapValues[North] * 0.1)
+        #Stop after 50 loops, or once nothing changes by epsilon or more
+        if self.epsilon is None:
+            loops = 50
         else:
-			eastUtility += (self.mapValues[Wait] * 0.1)
-        # If South isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still        
-        if self.mapValues[South] != "%":
-			eastUtility += (self.mapValues[South] * 0.1)
+            loops = self.maxLoops
+
+        #With warmStart, pick up from where the last move left off
+        dirty = None
+        if self.warmStart and self.utilities is not None:
+            dirty = self.warmStartValues(utilities, fixed, update, rewards)
+
+        if self.engine is not None:
+            #The array engine does the same sweeps, a whole board at a time
+            self.sweeps = self.engine.valIteration(utilities, update, rewards, discount, loops, self.epsilon, self.inPlace,
+                                                   self.deadline)
+            self.backups = self.sweeps * len(update)
+        elif dirty is not None:
+            self.incrementalIteration(rewards, discount, utilities, fixed, update, dirty, loops)
         else:
-			eastUtility += (self.mapValues[Wait] * 0.1)
-        #Add utility to "eastUtility" in dictionary   
-        self.utilityDictionary["eastUtility"] = eastUtility
-
-		# Rest of directions...
-        # If West isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[West] != "%":
-			westUtility = (self.mapValues[West] * 0.8)
+            calculateMEU = self.model.calculateMEU
+            #In place, the cells go red then black, in the same order as
+            #the array engine, so both backends give the same utilities
+            order = update
+            if self.inPlace:
+                order = self.model.redBlackOrder(update)
+            self.sweeps = 0
+            self.backups = 0
+            while loops > 0:
+                if self.inPlace:
+                    Vals = utilities
+                else:
+                    Vals = utilities[:]
+                residual = 0
+                for i in order:
+                    newValue = rewards[i] + discount * calculateMEU(Vals, i)
+                    residual = max(residual, abs(newValue - utilities[i]))
+                    utilities[i] = newValue
+                self.backups += len(update)
+                loops -=1
+                self.sweeps += 1
+                if self.epsilon is not None and residual < self.epsilon:
+                    break
+                if self.deadline is not None and self.deadline.passed():
+                    break
+
+        self.model.fromList(utilities, values1)
+        self.rememberUtilities(utilities, fixed, rewards)
+        return self.sweeps
+
+    #Function to find best strategy by policy iteration instead: evaluate the
+    #current policy, switch each cell to its best action, repeat until nothing
+    #switches. With warmStart both the utilities and the policy carry over from
+    #the last move.
+    def policyIteration(self, state, reward, discount, values1):
+
+        utilities, fixed, update = self.cellUtilities(state, values1)
+        rewards = self.cellRewards(state, reward)
+        if self.warmStart and self.utilities is not None:
+            self.warmStartValues(utilities, fixed, update, rewards)
         else:
-			westUtility = (self.mapValues[Wait] * 0.8)
-        # If North isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[North] != "%":
-			westUtility += (self.mapValues[North] * 0.1)
-        else:
-			westUtility += (self.mapValues[Wait] * 0.1)
-        # If South isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[South] != "%":
-			westUtility += (self.mapValues[South] * 0.1)
-        else:
-			westUtility += (self.mapValues[Wait] * 0.1)
-        #Add utility to "westUtility" in dictionary
-        self.utilityDictionary["westUtility"] = westUtility
+            self.policy = None
 
-        # If North isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[North] != "%":
-			northUtility = (self.mapValues[North] * 0.8)
+        if self.epsilon is None:
+            epsilon = 0.001
         else:
-			northUtility = (self.mapValues[Wait] * 0.8)
-        # If East isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[East] != "%":
-			northUtility += (self.mapValues[East] * 0.1)
+            epsilon = self.epsilon
+        self.policy, self.sweeps = self.policySolver.solve(utilities, fixed, update, rewards, discount, self.policy,
+                                                           self.evaluationSweeps, self.maxLoops, epsilon, self.deadline)
+        self.backups = 0
+
+        self.model.fromList(utilities, values1)
+        self.rememberUtilities(utilities, fixed, rewards)
+        return self.sweeps
+
+    #Function to find best strategy by prioritized sweeping. There are no
+    #sweeps as such, so only backups are counted. With warmStart only the cells
+    #near a reward that changed start off in the queue.
+    def prioritizedSweeping(self, state, reward, discount, values1):
+
+        utilities, fixed, update = self.cellUtilities(state, values1)
+        rewards = self.cellRewards(state, reward)
+        seeds = None
+        if self.warmStart and self.utilities is not None:
+            seeds = sorted(self.warmStartValues(utilities, fixed, update, rewards))
+
+        if self.epsilon is None:
+            threshold = 0.001
         else:
-			northUtility += (self.mapValues[Wait] * 0.1)
-        # If West isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[West] != "%":
-			northUtility += (self.mapValues[West] * 0.1)
+            threshold = self.epsilon
+        self.sweeps = 0
+        self.backups = self.prioritySolver.solve(utilities, fixed, update, rewards, discount, threshold,
+                                                 self.maxLoops * len(update), seeds, self.deadline)
+
+        self.model.fromList(utilities, values1)
+        self.rememberUtilities(utilities, fixed, rewards)
+        return self.backups
+
+    #Function to find best strategy by value iteration on the junctions only,
+    #with the corridors between them filled in afterwards. With warmStart the
+    #junctions start from last move's utilities.
+    def hierarchicalIteration(self, state, reward, discount, values1):
+
+        utilities, fixed, update = self.cellUtilities(state, values1)
+        rewards = self.cellRewards(state, reward)
+        if self.warmStart and self.utilities is not None:
+            self.warmStartValues(utilities, fixed, update, rewards)
+
+        if self.epsilon is None:
+            epsilon = 0.001
         else:
-			northUtility += (self.mapValues[Wait] * 0.1)
-        #Add utility to "northUtility" in dictionary
-        self.utilityDictionary["northUtility"] = northUtility
+            epsilon = self.epsilon
+        self.sweeps, self.backups = self.hierarchySolver.solve(utilities, fixed, update, rewards, discount,
+                                                               self.maxLoops, epsilon, self.deadline)
 
-        # If South isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[South] != "%":
-			southUtility = (self.mapValues[South] * 0.8)
-        else:
-			southUtility = (self.mapValues[Wait] * 0.8)
-        # If East isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[East] != "%":
-			southUtility += (self.mapValues[East] * 0.1)
+        self.model.fromList(utilities, values1)
+        self.rememberUtilities(utilities, fixed, rewards)
+        return self.sweeps
+
+    #Function to find best strategy by value iteration spread over a pool of
+    #processes, one tile of the board each.
+    def tiledIteration(self, state, reward, discount, values1):
+
+        utilities, fixed, update = self.cellUtilities(state, values1)
+        rewards = self.cellRewards(state, reward)
+        if self.warmStart and self.utilities is not None:
+            self.warmStartValues(utilities, fixed, update, rewards)
+
+        if self.epsilon is None:
+            epsilon = 0.001
         else:
-			southUtility += (self.mapValues[Wait] * 0.1)
-        # If West isn't a wall, then multiply whatever is in this location by the expected utility (outlined in Lecture 4) or multiply expected utility of staying still
-        if self.mapValues[West] != "%":
-			southUtility += (self.mapValues[West] * 0.1)
+            epsilon = self.epsilon
+        self.sweeps, self.backups = self.tileSolver.solve(utilities, fixed, rewards, discount, self.maxLoops,
+                                                          epsilon, self.tileSweeps, self.deadline)
+
+        self.model.fromList(utilities, values1)
+        self.rememberUtilities(utilities, fixed, rewards)
+        return self.sweeps
+
+    #Function to keep this move's answer for the statistics, for warmStart on
+    #the next one, and in the cache for later games if it was solved all the way
+    def rememberUtilities(self, utilities, fixed, rewards):
+        self.solved = (utilities, fixed, rewards)
+        if not self.warmStart:
+            return
+        self.utilities = utilities[:]
+        self.lastCellRewards = rewards[:]
+        self.lastRewards = {}
+        for i in range(len(utilities)):
+            if fixed[i]:
+                self.lastRewards[self.model.cells[i]] = utilities[i]
+        self.converged = self.deadline is None or not self.deadline.hit
+        if self.cache is not None and self.converged:
+            self.cache.put(self.cacheKey, self.utilities, self.lastRewards, self.lastCellRewards)
+
+    #Function to find utilities from an earlier game to start from, when there
+    #is nothing from the last move: those for the same food and capsules
+    def recallUtilities(self, state):
+        if self.cache is None:
+            return
+        self.cacheKey = self.cache.key(self.layoutHash, self.model, api.food(state), api.capsules(state))
+        if self.utilities is None:
+            entry = self.cache.get(self.cacheKey)
+            if entry is not None:
+                self.utilities, self.lastRewards, self.lastCellRewards = entry
+                self.converged = True
+
+    #Function to start from last move's utilities instead of from scratch.
+    #Terminal cells keep this move's rewards, every other free cell gets its old
+    #utility back. Returns the cells that need recomputing: those whose reward
+    #changed, and their neighbours, since their utility depends on it, as well as
+    #any cell whose reward for being there changed. If the last move was
+    #stopped before it converged, that is all of them.
+    def warmStartValues(self, utilities, fixed, update, rewards):
+        index = self.model.index
+        terminals = {}
+        for i in range(len(utilities)):
+            if fixed[i]:
+                terminals[self.model.cells[i]] = utilities[i]
+
+        changed = []
+        for cell in set(terminals.keys()) | set(self.lastRewards.keys()):
+            if terminals.get(cell) != self.lastRewards.get(cell):
+                changed.append(index[cell])
+
+        for i in update:
+            utilities[i] = self.utilities[i]
+        if not self.converged or self.lastCellRewards is None:
+            return set(update)
+
+        dirty = set()
+        for i in changed:
+            if not fixed[i]:
+                dirty.add(i)
+            for next in self.model.neighbours[i]:
+                if not fixed[next]:
+                    dirty.add(next)
+        for i in update:
+            if rewards[i] != self.lastCellRewards[i]:
+                dirty.add(i)
+        return dirty
+
+    #Function to re-solve only where needed. Each pass updates the dirty cells
+    #in place; any cell that moves by epsilon or more makes itself (moving into a
+    #wall leaves pacman where he is, so a cell can depend on itself) and its
+    #neighbours dirty for the next pass. Changes smaller than epsilon aren't
+    #passed on, but they add up, so when nothing is dirty every cell in update is
+    #checked, and any that is still off by epsilon or more goes round again. The
+    #work done depends on how much the board changed rather than on how big it is,
+    #bar that one check.
+    def incrementalIteration(self, rewards, discount, utilities, fixed, update, dirty, loops):
+        calculateMEU = self.model.calculateMEU
+        neighbours = self.model.neighbours
+        self.sweeps = 0
+        self.backups = 0
+        while loops > 0:
+            if not dirty:
+                dirty = set(i for i in update
+                            if abs(rewards[i] + discount * calculateMEU(utilities, i) - utilities[i]) >= self.epsilon)
+                self.backups += len(update)
+                if not dirty:
+                    break
+            nextDirty = set()
+            for i in sorted(dirty):
+                newValue = rewards[i] + discount * calculateMEU(utilities, i)
+                if abs(newValue - utilities[i]) >= self.epsilon:
+                    nextDirty.add(i)
+                    for next in neighbours[i]:
+                        if not fixed[next]:
+                            nextDirty.add(next)
+                utilities[i] = newValue
+                self.backups += 1
+            dirty = nextDirty
+            loops -= 1
+            self.sweeps += 1
+            if self.deadline is not None and self.deadline.passed():
+                break
+
+    # Function to move pacman in best way possible, updating after every step.
+    # The expected utility of each move is read off the transition tables, and
+    # ties go the same way they always have: West, South, East, then North.
+    def getRules(self, state, valueMap):
+        utilities = self.model.toList(valueMap)
+        return self.model.bestAction(utilities, self.model.index[api.whereAmI(state)])
+
+    #Function to start solving, in the background, for the state that move
+    #leads to if the ghosts don't move. Nothing is planned once the game is over.
+    def startPlanning(self, state, move):
+        if not self.background:
+            return
+        next = state.generateSuccessor(0, move)
+        if next.isWin() or next.isLose():
+            return
+        self.plannerDeadline = mdpEngines.Deadline(float("inf"))
+        self.planner = threading.Thread(target=self.plan, args=(next, self.plannerDeadline))
+        self.planner.daemon = True
+        self.plansStarted += 1
+        self.planner.start()
+
+    def plan(self, state, deadline):
+        self.deadline = deadline
+        self.solve(state, self.createMapValues(state))
+
+    #Function to stop the background solver, if it is running, and wait for it.
+    #What it got done is in self.utilities, ready for warmStart.
+    def stopPlanning(self):
+        if self.planner is None:
+            return
+        if not self.planner.is_alive():
+            self.plansFinished += 1
+        self.plannerDeadline.expire()
+        self.planner.join()
+        self.planner = None
+        self.deadline = None
+
+    #How far the last utilities solved, or those in solved (a self.solved
+    #from earlier), are from solved, with the discount solve uses.
+    def solvedResidual(self, solved=None):
+        if solved is None:
+            solved = self.solved
+        utilities, fixed, rewards = solved
+        return self.model.bellmanResidual(utilities, fixed, rewards, self.discount)
+
+    #Everything besides the layout that the solved policy depends on. A
+    #compiled policy table is only used if it was made with the same.
+    def rewardParameters(self):
+        return {'food': self.foodReward, 'capsule': self.capsuleReward, 'ghost': self.ghostReward,
+                'reward': self.reward, 'discount': self.discount,
+                'directionProb': api.directionProb, 'nonDeterministic': api.nonDeterministic}
+
+    #Function to look the move up in the compiled policy table. Only works
+    #with no ghosts about, and gives None if the table doesn't have this
+    #food and these capsules.
+    def tableAction(self, state):
+        if self.policyTable is None or api.ghosts(state):
+            return None
+        key = (mdpEngines.bitset(self.model, api.food(state)), mdpEngines.bitset(self.model, api.capsules(state)))
+        a = self.policyTable.lookup(key, self.model.index[api.whereAmI(state)])
+        if a is None:
+            self.tableMisses += 1
+            return None
+        self.tableHits += 1
+        return self.model.actions[a]
+
+    #Function to run whichever solver was asked for, with the reward and
+    #discount asked for (0.2 and 0.8 unless told otherwise)
+    def solve(self, state, mapValues):
+        self.recallUtilities(state)
+        if self.solver == "policy":
+            self.policyIteration(state, self.reward, self.discount, mapValues)
+        elif self.solver == "prioritized":
+            self.prioritizedSweeping(state, self.reward, self.discount, mapValues)
+        elif self.solver == "hierarchical":
+            self.hierarchicalIteration(state, self.reward, self.discount, mapValues)
+        elif self.solver == "tiled":
+            self.tiledIteration(state, self.reward, self.discount, mapValues)
         else:
-			southUtility += (self.mapValues[Wait] * 0.1)
-        #Add utility to "southUtility" in dictionary
-        self.utilityDictionary["southUtility"] = southUtility
-
-        #bestMEU is maxium utility
-        bestMEU = max(self.utilityDictionary.values())
-        #Reurn move of bestMEU
-        return self.utilityDictionary.keys() [self.utilityDictionary.values().index(bestMEU)]
+            self.valIteration(state, self.reward, self.discount, mapValues)
 
     #Action!
     def getAction(self, state):
+        stats = self.stats
+        if stats is not None:
+            stats.startMove()
+        #Take over from the background planner
+        self.stopPlanning()
+        if stats is not None:
+            stats.endPhase("planner")
+        #Start the clock for this move
+        self.moves += 1
+        if self.budget is not None:
+            self.deadline = mdpEngines.Deadline(self.budget)
         #Create map
-        self.map.prettyDisplay()
+        if self.showMap:
+            self.map.prettyDisplay(self.shownValues)
+        if stats is not None:
+            stats.endPhase("display")
+        legal = api.legalActions(state)
+        #Play from the compiled policy if it has this position
+        action = self.tableAction(state)
+        if action is not None:
+            self.map.update(state)
+            move = api.makeMove(action, legal, state)
+            if stats is not None:
+                stats.endPhase("action")
+                stats.endMove(0, 0, None)
+            return move
         #Get utilites
         mapValues = self.createMapValues(state)
-        #Update Food        
-        self.updateFoodInMap(state)
-
-        # Assign all utilities for locations in the map then apply bellman for each state with reward of 0.2 and discount of 0.8
-        for i in range(self.map.getWidth()):
-                for j in range(self.map.getHeight()):
-                    if self.map.getValue(i,j) != "%":
-                        self.map.setValue(i,j, mapValues[(i,j)])
-        self.valIteration(state, .2, .8, mapValues)         
-               
-                
-        # Get the actions we can try
-        legal = api.legalActions(state)
-
-        #If the key of best move is East, choose East
-        if self.getRules(state, mapValues) == "eastUtility":
-            return api.makeMove('East', legal)
-        #If the key of best move is West, choose West
-        if self.getRules(state, mapValues) == "westUtility":
-            return api.makeMove('West', legal) 
-        #If the key of best move is North, choose North
-        if self.getRules(state, mapValues) == "northUtility":
-            return api.makeMove('North', legal)
-        #If the key of best move is South, choose South
-        if self.getRules(state, mapValues) == "southUtility":
-            return api.makeMove('South', legal)      
-        
-
-        # Random choice between the legal options.              
-        #nextChoice = api.makeMove(random.choice(legal), legal)
-        #return nextChoice
-
-
-            
-    
-     
-
-        
-    
-
-   
+        #Show them on the map next time
+        self.shownValues = dict(mapValues)
+        if stats is not None:
+            stats.endPhase("map")
+
+        # Apply bellman for each state with the reward and discount
+        self.solve(state, mapValues)
+        if self.deadline is not None and self.deadline.hit:
+            self.deadlineHits += 1
+        if stats is not None:
+            stats.endPhase("solve")
+
+        #Make the move with the best MEU, and start thinking about the next one
+        move = api.makeMove(self.getRules(state, mapValues), legal, state)
+        if stats is not None:
+            stats.endPhase("action")
+            #The planner solves over these, so take them first. Every solve
+            #makes a new self.solved, so the residual can still be worked
+            #out from this one afterwards, without being timed.
+            sweeps, backups, solved = self.sweeps, self.backups, self.solved
+        self.startPlanning(state, move)
+        if stats is not None:
+            stats.endPhase("planner")
+            stats.endMove(sweeps, backups, self.solvedResidual(solved))
+        return move
@@ -0,0 +1,159 @@
+# mdpCompiler.py
+# robinson/09-dec-2018
+#
+# Compiles the policy MDPAgent would follow on a layout without ghosts
+# into a table, so that the agent can look its moves up instead of
+# solving the MDP on every one:
+#
+# python mdpCompiler.py -l mediumClassicNoGhosts -o medium.policy
+# python pacman.py -p MDPAgent -l mediumClassicNoGhosts -a policyTable=medium.policy
+#
+# With no ghosts, the MDP only changes when a piece of food or a
+# capsule is eaten, so there is one policy for each set of food and
+# capsules left, covering every cell. Starting from the layout as it is
+# at the start of a game, the compiler solves the MDP, then follows the
+# policy from where Pacman is, slips and all, to find every piece of
+# food or capsule he can eat next, and how likely he is to eat each.
+# Each of those gives a new set of food and capsules to solve for, with
+# Pacman starting where he ate it. There are far too many of those for
+# a big layout, so they are solved most likely first, and --limit says
+# how many to solve; the agent solves for itself on any it doesn't find.
+#
+# The table records the layout's hash and the rewards it was compiled
+# with, and the agent won't use it for anything else.
+#
+# As required by the licensing agreement for the PacMan AI we have:
+#
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+from game import Configuration
+from game import Directions
+from mdpAgents import Board
+from mdpAgents import MDPAgent
+from optparse import OptionParser
+from pacman import GameState
+import api
+import heapq
+import layout
+import mdpEngines
+import pacman
+import sys
+
+# The number of the best action in each cell, given the solved
+# utilities. Ties go the same way as in TransitionModel.bestAction.
+def bestActions(model, utilities):
+    actions = []
+    for i in range(len(utilities)):
+        values = model.expectedUtilities(utilities, i)
+        actions.append(values.index(max(values)))
+    return actions
+
+# The food and capsule cells Pacman can get to first from cell start,
+# following actions, and the chance of each, as a dictionary. The
+# chances are found by moving Pacman one step at a time, slips and all,
+# until all but tolerance of him has got somewhere, or for at most
+# maxSteps steps in case the policy keeps him away from them.
+def reachableTerminals(model, actions, terminals, start, tolerance=0.001, maxSteps=1000):
+    reached = {}
+    where = {start: 1.0}
+    left = 1.0
+    steps = 0
+    while left > tolerance and steps < maxSteps:
+        steps += 1
+        next = {}
+        for i, chance in where.items():
+            for cells, p in zip(model.successors[actions[i]], model.probabilities):
+                if p == 0:
+                    continue
+                j = cells[i]
+                if j in terminals:
+                    reached[j] = reached.get(j, 0) + chance * p
+                    left -= chance * p
+                else:
+                    next[j] = next.get(j, 0) + chance * p
+        where = next
+    return reached
+
+# Solve for every set of food and capsules that a game on layoutName can
+# reach from the start, up to limit of them, and return the table.
+def compilePolicy(layoutName, agentArgs, limit):
+    board = layout.getLayout(layoutName)
+    if board is None:
+        raise Exception("The layout " + layoutName + " cannot be found")
+    if board.getNumGhosts() > 0:
+        raise Exception("Policy tables are only for layouts without ghosts")
+
+    agent = MDPAgent(**pacman.parseAgentArgs(agentArgs))
+    if agent.windowRadius is not None:
+        raise Exception("Policy tables need the MDP solved for the whole board, not a window")
+    initial = GameState()
+    initial.initialize(board, 0)
+    agent.registerInitialState(initial)
+    model = agent.model
+    planes = bytearray(agent.map.planes)
+
+    table = mdpEngines.PolicyTable(mdpEngines.layoutHash(model), agent.rewardParameters())
+    allFood = api.food(initial)
+    allCapsules = api.capsules(initial)
+    # Positions still to look at, most likely first, as (minus the
+    # chance of getting there, food and capsules left, Pacman's cell)
+    start = (frozenset(allFood), frozenset(allCapsules))
+    queue = [(-1.0, start, model.index[api.whereAmI(initial)])]
+    entries = set()
+    while queue and len(table.policies) < limit:
+        chance, (food, capsules), position = heapq.heappop(queue)
+        key = (mdpEngines.bitset(model, food), mdpEngines.bitset(model, capsules))
+
+        # Solve for this food and these capsules, the first time they
+        # come up
+        if key not in table.policies:
+            state = initial.deepCopy()
+            state.data.food = initial.data.food.copy()
+            for (x, y) in allFood:
+                state.data.food[x][y] = (x, y) in food
+            state.data.capsules = [cell for cell in allCapsules if cell in capsules]
+            state.data.agentStates[0].configuration = Configuration(model.cells[position], Directions.STOP)
+            agent.map.planes = bytearray(planes)
+            for (x, y) in allFood + allCapsules:
+                if (x, y) not in food and (x, y) not in capsules:
+                    agent.map.set(Board.VISITED, x, y)
+            mapValues = agent.createMapValues(state)
+            agent.solve(state, mapValues)
+            table.add(key, bestActions(model, model.toList(mapValues)))
+        actions = [table.lookup(key, i) for i in range(len(model.cells))]
+
+        # Then look for what can be eaten next
+        terminals = set(model.index[cell] for cell in food | capsules)
+        for i, p in reachableTerminals(model, actions, terminals, position).items():
+            cell = model.cells[i]
+            next = (food - set([cell]), capsules - set([cell]))
+            if next[0] and (next, i) not in entries:
+                entries.add((next, i))
+                heapq.heappush(queue, (chance * p, next, i))
+
+    print "Compiled", len(table.policies), "policies,", len(queue), "positions left unsolved"
+    return table
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="python mdpCompiler.py -l LAYOUT -o FILE [options]")
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassicNoGhosts',
+                      help='the layout to compile a policy for, which must have no ghosts')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='file to write the policy table to')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs', default='epsilon=0.00001,maxLoops=10000',
+                      help='options for the MDPAgent that solves it, as for pacman.py')
+    parser.add_option('--limit', dest='limit', type='int', default=5000,
+                      help='most sets of food and capsules to solve for')
+    options, otherjunk = parser.parse_args(sys.argv[1:])
+    if options.output is None:
+        parser.error("no output file given")
+    compilePolicy(options.layout, options.agentArgs, options.limit).save(options.output)
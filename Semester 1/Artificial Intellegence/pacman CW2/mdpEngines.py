@@ -0,0 +1,1425 @@
+# mdpEngines.py
+# robinson/09-dec-2018
+#
+# Solver backends for the MDPAgent in mdpAgents.py.
+#
+# The agent keeps its utilities in a dictionary keyed by (x, y), which
+# is simple but slow: every sweep of value iteration touches every
+# cell from Python. The engines here store the same information as
+# arrays, so that a whole sweep can be done in one go.
+#
+# As required by the licensing agreement for the PacMan AI we have:
+#
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+from array import array
+from collections import OrderedDict
+from game import Directions
+import api
+import copy
+import cPickle
+import csv
+import hashlib
+import heapq
+import json
+import multiprocessing
+import multiprocessing.sharedctypes
+import os
+import time
+import timeit
+
+# NumPy is optional. If it isn't installed the agent sticks to the
+# plain Python backend.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# SciPy is optional too. Policy iteration uses its sparse solver to
+# evaluate a policy exactly, and falls back on sweeps without it.
+try:
+    import scipy.sparse
+    import scipy.sparse.linalg
+except ImportError:
+    scipy = None
+
+def numpyAvailable():
+    return np is not None
+
+def scipyAvailable():
+    return np is not None and scipy is not None
+
+#
+# A time limit for a solver.
+#
+# The solvers below all work by repeating some step (a sweep, a pass
+# of policy iteration, a backup) until they converge. Given a
+# Deadline, they also stop after the first step that ends past it, so
+# that they always have the best answer they have got to so far ready
+# in time. hit records whether that happened.
+#
+class Deadline:
+
+    def __init__(self, seconds):
+        self.end = time.time() + seconds
+        self.hit = False
+
+    def passed(self):
+        if time.time() >= self.end:
+            self.hit = True
+        return self.hit
+
+    # Make the deadline pass now.
+    def expire(self):
+        self.end = 0
+
+#
+# The motion model, as lookup tables.
+#
+# Every free cell gets a number, and for each move Pacman can try we
+# store, for every cell, the numbers of the cells he could end up in
+# (where he meant to go, and the two places he can slip to) together
+# with how likely each of these is. The tables only depend on the
+# walls, so they are built once per layout, and after that a Bellman
+# backup is just a few list lookups.
+#
+# All the solvers below take the reward for being in each cell as a
+# list by cell number, rewards, alongside the utilities, so that it
+# can differ from cell to cell (see ThreatField).
+#
+class TransitionModel:
+
+    # The moves Pacman can try, in the order that ties between them are
+    # broken when choosing a move.
+    actions = [Directions.WEST, Directions.SOUTH, Directions.EAST, Directions.NORTH]
+
+    # The two directions Pacman can slip into when trying each move.
+    sideways = {Directions.WEST: (Directions.NORTH, Directions.SOUTH),
+                Directions.EAST: (Directions.NORTH, Directions.SOUTH),
+                Directions.NORTH: (Directions.EAST, Directions.WEST),
+                Directions.SOUTH: (Directions.EAST, Directions.WEST)}
+
+    vectors = {Directions.NORTH: (0, 1),
+               Directions.SOUTH: (0, -1),
+               Directions.EAST: (1, 0),
+               Directions.WEST: (-1, 0)}
+
+    # Constructor
+    #
+    # walls is the list of (x, y) wall positions from api.walls(). The
+    # probabilities follow api.directionProb and api.nonDeterministic
+    # unless they are given here.
+    #
+    # It creates:
+    #
+    # cells:         the (x, y) position of each free cell, by number.
+    # index:         the number of each free cell, by (x, y) position.
+    # successors:    for each action, three arrays giving, for each
+    #                cell, where Pacman ends up if he goes the way he
+    #                meant to, and if he slips either way. Moving into
+    #                a wall means staying put.
+    # probabilities: the chance of each of those three outcomes.
+    # neighbours:    for each cell, the free cells next to it, which
+    #                are the ones whose utility depends on it.
+    def __init__(self, width, height, walls, directionProb=None, nonDeterministic=None):
+        if directionProb is None:
+            directionProb = api.directionProb
+        if nonDeterministic is None:
+            nonDeterministic = api.nonDeterministic
+
+        self.width = width
+        self.height = height
+        self.walls = list(walls)
+
+        wallSet = set(self.walls)
+        self.cells = [(x, y) for x in range(width) for y in range(height)
+                      if (x, y) not in wallSet]
+        self.index = dict((cell, i) for i, cell in enumerate(self.cells))
+
+        self.successors = []
+        for action in self.actions:
+            outcomes = []
+            for direction in (action,) + self.sideways[action]:
+                dx, dy = self.vectors[direction]
+                targets = array('i')
+                for i, (x, y) in enumerate(self.cells):
+                    targets.append(self.index.get((x + dx, y + dy), i))
+                outcomes.append(targets)
+            self.successors.append(tuple(outcomes))
+
+        if nonDeterministic:
+            slip = 0.5 * (1 - directionProb)
+            self.probabilities = (directionProb, slip, slip)
+        else:
+            self.probabilities = (1.0, 0.0, 0.0)
+
+        self.neighbours = []
+        for (x, y) in self.cells:
+            next = [self.index[(x + dx, y + dy)] for (dx, dy) in self.vectors.values()
+                    if (x + dx, y + dy) in self.index]
+            self.neighbours.append(array('i', sorted(next)))
+
+    # Expected utility of each action from cell i, in the order of
+    # actions.
+    def expectedUtilities(self, utilities, i):
+        p, q, r = self.probabilities
+        return [utilities[intended[i]] * p + utilities[left[i]] * q + utilities[right[i]] * r
+                for intended, left, right in self.successors]
+
+    # Expected utility of doing action number a in cell i.
+    def expectedUtility(self, utilities, i, a):
+        p, q, r = self.probabilities
+        intended, left, right = self.successors[a]
+        return utilities[intended[i]] * p + utilities[left[i]] * q + utilities[right[i]] * r
+
+    # Maximum expected utility of cell i.
+    def calculateMEU(self, utilities, i):
+        p, q, r = self.probabilities
+        best = None
+        for intended, left, right in self.successors:
+            value = utilities[intended[i]] * p + utilities[left[i]] * q + utilities[right[i]] * r
+            if best is None or value > best:
+                best = value
+        return best
+
+    # The most that a Bellman backup would change any cell that isn't
+    # fixed: how far utilities are from being solved.
+    def bellmanResidual(self, utilities, fixed, rewards, discount):
+        residual = 0
+        for i in range(len(utilities)):
+            if not fixed[i]:
+                change = abs(rewards[i] + discount * self.calculateMEU(utilities, i) - utilities[i])
+                residual = max(residual, change)
+        return residual
+
+    # The cells numbered in update, red cells before black ones, where
+    # a cell is red if x + y is even. Every neighbour of a red cell is
+    # black, so updating them in place in this order is the same
+    # Gauss-Seidel sweep that ArrayEngine.inPlaceSweep does a colour at
+    # a time.
+    def redBlackOrder(self, update):
+        cells = self.cells
+        return sorted(update, key=lambda i: ((cells[i][0] + cells[i][1]) % 2, i))
+
+    # The MEU action from cell i. Ties go to the earliest in actions.
+    def bestAction(self, utilities, i):
+        values = self.expectedUtilities(utilities, i)
+        return self.actions[values.index(max(values))]
+
+    # Utilities of the free cells, as a list by cell number, from a
+    # mapValues dictionary, and back again.
+    def toList(self, mapValues):
+        return [mapValues[cell] for cell in self.cells]
+
+    def fromList(self, utilities, mapValues):
+        for i, cell in enumerate(self.cells):
+            mapValues[cell] = utilities[i]
+
+#
+# A value iteration engine that holds the map as 2-D arrays.
+#
+# Arrays are indexed [x, y], just like game.Grid, so (0, 0) is the
+# bottom left of the board. Pacman layouts are always surrounded by
+# walls, so only the interior [1:-1, 1:-1] ever needs updating, and
+# the neighbours of the interior are then just the interior shifted by
+# one cell in each direction.
+#
+# When only some cells are updated, as with a window around Pacman,
+# the arrays only cover the box around those cells and the ring of
+# cells around that (see crop()), so a move costs as much as the
+# window, not the board.
+#
+class ArrayEngine:
+
+    # Constructor
+    #
+    # model is the TransitionModel for the layout, which gives the
+    # walls and the motion probabilities. The wall mask never changes
+    # during a game, so it is only made once, here.
+    def __init__(self, model):
+        self.boardWidth = model.width
+        self.boardHeight = model.height
+        self.probabilities = model.probabilities
+
+        self.boardWalls = np.zeros((model.width, model.height), dtype=bool)
+        for (x, y) in model.walls:
+            self.boardWalls[x, y] = True
+
+        # Where each numbered free cell lives on the board.
+        self.cellXs = np.array([x for (x, y) in model.cells], dtype=int)
+        self.cellYs = np.array([y for (x, y) in model.cells], dtype=int)
+
+        self.setBox(0, model.width, 0, model.height)
+
+    # Make the arrays cover columns x0 to x1 and rows y0 to y1 of the
+    # board (not including x1 and y1), and do all the "is my neighbour
+    # a wall" tests for that part of it. The box has to have a wall or
+    # a cell that isn't updated all the way round its edge.
+    def setBox(self, x0, x1, y0, y1):
+        self.x0 = x0
+        self.y0 = y0
+        self.walls = self.boardWalls[x0:x1, y0:y1]
+        self.width, self.height = self.walls.shape
+
+        # Which numbered free cells are in the box, and where they live
+        # in the arrays.
+        inside = (self.cellXs >= x0) & (self.cellXs < x1) & (self.cellYs >= y0) & (self.cellYs < y1)
+        self.numbers = np.flatnonzero(inside)
+        self.xs = self.cellXs[inside] - x0
+        self.ys = self.cellYs[inside] - y0
+
+        # For each interior cell, is the neighbour in that direction a
+        # wall? If so, trying to move that way means staying put.
+        self.northWall = self.walls[1:-1, 2:]
+        self.southWall = self.walls[1:-1, :-2]
+        self.eastWall = self.walls[2:, 1:-1]
+        self.westWall = self.walls[:-2, 1:-1]
+
+        # A checkerboard colouring of the board. Every neighbour of a
+        # red cell is black and vice versa, so updating all the red cells
+        # and then all the black ones is a Gauss-Seidel sweep, the same
+        # one as TransitionModel.redBlackOrder gives. It goes by where
+        # the cells are on the board, so a box is coloured the same as
+        # the whole board would be.
+        red = np.add.outer(np.arange(x0, x1), np.arange(y0, y1)) % 2 == 0
+        self.colours = [red, ~red]
+
+    # An engine for just the cells numbered in update and their
+    # neighbours, or this one if that is most of the board anyway.
+    def crop(self, update):
+        if len(update) == 0:
+            return self
+        xs = self.cellXs[update]
+        ys = self.cellYs[update]
+        x0, x1 = int(xs.min()) - 1, int(xs.max()) + 2
+        y0, y1 = int(ys.min()) - 1, int(ys.max()) + 2
+        if (x0, x1, y0, y1) == (self.x0, self.x0 + self.width, self.y0, self.y0 + self.height):
+            return self
+        engine = copy.copy(self)
+        engine.setBox(x0, x1, y0, y1)
+        return engine
+
+    # Copy a list of utilities, by cell number, into an array. Walls are
+    # left at zero, they are never read.
+    def toArray(self, utilities):
+        board = np.zeros((self.width, self.height))
+        board[self.xs, self.ys] = np.asarray(utilities)[self.numbers]
+        return board
+
+    # And back again, as plain floats, so that the rest of the agent
+    # sees exactly what the python backend would have given it. Only
+    # the cells in the box are copied back.
+    def fromArray(self, board, utilities):
+        for i, value in zip(self.numbers.tolist(), board[self.xs, self.ys].tolist()):
+            utilities[i] = value
+
+    # A mask of the cells that value iteration is allowed to change,
+    # given by their cell numbers.
+    def updateMask(self, update):
+        mask = np.zeros((self.width, self.height), dtype=bool)
+        mask[self.cellXs[update] - self.x0, self.cellYs[update] - self.y0] = True
+        return mask
+
+    # The expected utility of each of the four moves, for every interior
+    # cell at once. As in TransitionModel, moving into a wall leaves
+    # Pacman where he is.
+    #
+    # The terms are added up in the same order as
+    # TransitionModel.calculateMEU does, so the results are identical,
+    # not just close.
+    def expectedUtilities(self, utilities):
+        p, q, r = self.probabilities
+        here = utilities[1:-1, 1:-1]
+        north = np.where(self.northWall, here, utilities[1:-1, 2:])
+        south = np.where(self.southWall, here, utilities[1:-1, :-2])
+        east = np.where(self.eastWall, here, utilities[2:, 1:-1])
+        west = np.where(self.westWall, here, utilities[:-2, 1:-1])
+
+        westUtility = west * p + north * q + south * r
+        eastUtility = east * p + north * q + south * r
+        northUtility = north * p + east * q + west * r
+        southUtility = south * p + east * q + west * r
+        return westUtility, eastUtility, northUtility, southUtility
+
+    # Maximum expected utility of every interior cell.
+    def calculateMEU(self, utilities):
+        westUtility, eastUtility, northUtility, southUtility = self.expectedUtilities(utilities)
+        return np.maximum(np.maximum(westUtility, eastUtility),
+                          np.maximum(northUtility, southUtility))
+
+    # One Jacobi sweep of the Bellman update, with rewards as an array
+    # like utilities. Returns a new array and the largest change made to
+    # any cell.
+    def sweep(self, utilities, mask, rewards, discount):
+        updated = utilities.copy()
+        inner = mask[1:-1, 1:-1]
+        new = rewards[1:-1, 1:-1][inner] + discount * self.calculateMEU(utilities)[inner]
+        residual = self.residual(new, utilities[1:-1, 1:-1][inner])
+        updated[1:-1, 1:-1][inner] = new
+        return updated, residual
+
+    # One Gauss-Seidel sweep, red cells then black cells. utilities is
+    # updated in place, so the black cells already see the new red
+    # values.
+    def inPlaceSweep(self, utilities, mask, rewards, discount):
+        residual = 0
+        for colour in self.colours:
+            inner = (mask & colour)[1:-1, 1:-1]
+            new = rewards[1:-1, 1:-1][inner] + discount * self.calculateMEU(utilities)[inner]
+            residual = max(residual, self.residual(new, utilities[1:-1, 1:-1][inner]))
+            utilities[1:-1, 1:-1][inner] = new
+        return utilities, residual
+
+    def residual(self, new, old):
+        if new.size == 0:
+            return 0
+        return float(np.abs(new - old).max())
+
+    # Run value iteration for at most the given number of loops,
+    # changing only the cells numbered in update. If epsilon is given,
+    # stop as soon as no cell changes by more than epsilon. If inPlace
+    # is True, use Gauss-Seidel sweeps rather than Jacobi ones.
+    #
+    # utilities is a list by cell number, as used with TransitionModel,
+    # and is updated in place, so this is a drop in replacement for the
+    # sweeps in MDPAgent.valIteration. It also stops once deadline, if
+    # given, has passed. Returns the number of sweeps used.
+    def valIteration(self, utilities, update, rewards, discount, loops, epsilon=None, inPlace=False,
+                     deadline=None):
+        engine = self.crop(update)
+        board = engine.toArray(utilities)
+        rewardBoard = engine.toArray(rewards)
+        mask = engine.updateMask(update)
+        sweeps = 0
+        while loops > 0:
+            if inPlace:
+                board, residual = engine.inPlaceSweep(board, mask, rewardBoard, discount)
+            else:
+                board, residual = engine.sweep(board, mask, rewardBoard, discount)
+            sweeps += 1
+            loops -= 1
+            if epsilon is not None and residual < epsilon:
+                break
+            if deadline is not None and deadline.passed():
+                break
+        engine.fromArray(board, utilities)
+        return sweeps
+
+#
+# Policy iteration.
+#
+# Rather than improving the utilities a little on every sweep, fix a
+# policy (an action number for every cell), work out exactly what it
+# is worth, switch every cell to its best action given those
+# utilities, and repeat until the policy stops changing. Each pass is
+# more work than a sweep, but far fewer are needed.
+#
+# Evaluating a policy means solving, for every cell i that isn't
+# terminal,
+#
+# U(i) = reward(i) + discount * sum of P(j | i, policy(i)) * U(j)
+#
+# which is a sparse linear system with one row per cell. With SciPy
+# it is solved directly. Without it, or if evaluationSweeps is given
+# (modified policy iteration), it is approximated by sweeps.
+#
+class PolicyIteration:
+
+    def __init__(self, model):
+        self.model = model
+        self.exact = scipyAvailable()
+        if self.exact:
+            # successors[a, k, i] is outcome k of action a in cell i.
+            self.successors = np.array([[list(outcome) for outcome in outcomes]
+                                        for outcomes in model.successors], dtype=int)
+            self.probabilities = np.array(model.probabilities)
+
+    # Make policy greedy with respect to utilities. A cell only changes
+    # action if another one is better by more than tolerance, so that
+    # ties, and near ties that are only rounding error, can't make the
+    # policy flip back and forth forever. Returns the number of cells
+    # that changed.
+    def improve(self, utilities, update, policy, tolerance=0):
+        changed = 0
+        for i in update:
+            values = self.model.expectedUtilities(utilities, i)
+            best = max(values)
+            if policy[i] is None or best - values[policy[i]] > tolerance:
+                policy[i] = values.index(best)
+                changed += 1
+        return changed
+
+    # Approximate evaluation: Gauss-Seidel sweeps of the policy's
+    # Bellman equation, at most sweeps of them, stopping early once no
+    # cell changes by epsilon or more, or once deadline has passed.
+    # Returns the last residual.
+    def evaluateBySweeps(self, utilities, update, policy, rewards, discount, sweeps, epsilon, deadline=None):
+        expectedUtility = self.model.expectedUtility
+        residual = 0
+        while sweeps > 0:
+            residual = 0
+            for i in update:
+                newValue = rewards[i] + discount * expectedUtility(utilities, i, policy[i])
+                residual = max(residual, abs(newValue - utilities[i]))
+                utilities[i] = newValue
+            sweeps -= 1
+            if epsilon is not None and residual < epsilon:
+                break
+            if deadline is not None and deadline.passed():
+                break
+        return residual
+
+    # Exact evaluation, with a sparse solve. Terminal cells have known
+    # utilities, so they move to the right hand side.
+    def evaluateExactly(self, utilities, fixed, update, policy, rewards, discount):
+        if not update:
+            return 0
+        known = np.array(utilities)
+        isFixed = np.array(fixed, dtype=bool)
+        rows = np.array(update, dtype=int)
+        actions = np.array([policy[i] for i in update], dtype=int)
+
+        # Where each updated cell's unknown sits in the system.
+        column = np.zeros(len(utilities), dtype=int)
+        column[rows] = np.arange(len(rows))
+
+        size = len(rows)
+        b = np.array(rewards)[rows]
+        row, col, data = [np.arange(size)], [np.arange(size)], [np.ones(size)]
+        for k in range(3):
+            targets = self.successors[actions, k, rows]
+            weight = discount * self.probabilities[k]
+            unknown = ~isFixed[targets]
+            row.append(np.arange(size)[unknown])
+            col.append(column[targets[unknown]])
+            data.append(np.empty(unknown.sum()))
+            data[-1].fill(-weight)
+            b[~unknown] += weight * known[targets[~unknown]]
+
+        A = scipy.sparse.coo_matrix((np.concatenate(data), (np.concatenate(row), np.concatenate(col))),
+                                    shape=(size, size)).tocsc()
+        solution = scipy.sparse.linalg.spsolve(A, b)
+        for i, value in zip(update, solution.tolist()):
+            utilities[i] = value
+        return 0
+
+    # Run policy iteration, at most maxIterations passes of evaluation
+    # and improvement. utilities is a list by cell number, updated in
+    # place; fixed and update say which cells are terminal and which
+    # are not. policy can carry over from an earlier call; missing
+    # entries start greedy with respect to utilities.
+    #
+    # With evaluationSweeps set this is modified policy iteration: each
+    # evaluation is only that many sweeps, and it finishes once the
+    # policy is stable and the last sweep moved nothing by epsilon.
+    #
+    # If deadline is given, it stops at the first pass that ends after
+    # it, and the policy is then greedy with respect to the last
+    # evaluation. Returns the policy and the number of passes used.
+    def solve(self, utilities, fixed, update, rewards, discount, policy=None,
+              evaluationSweeps=None, maxIterations=1000, epsilon=0.001, deadline=None):
+        if policy is None:
+            policy = [None] * len(utilities)
+        tolerance = epsilon * 1e-3
+        self.improve(utilities, update, policy, tolerance)
+
+        iterations = 0
+        while iterations < maxIterations:
+            if evaluationSweeps is not None:
+                residual = self.evaluateBySweeps(utilities, update, policy, rewards, discount, evaluationSweeps, None,
+                                                 deadline)
+            elif self.exact:
+                residual = self.evaluateExactly(utilities, fixed, update, policy, rewards, discount)
+            else:
+                residual = self.evaluateBySweeps(utilities, update, policy, rewards, discount, maxIterations, epsilon,
+                                                 deadline)
+            iterations += 1
+            if self.improve(utilities, update, policy, tolerance) == 0 and residual < epsilon:
+                break
+            if deadline is not None and deadline.passed():
+                break
+        return policy, iterations
+
+#
+# Prioritized sweeping.
+#
+# Most cells settle down within a few sweeps, so sweeping the whole
+# board over and over mostly recomputes numbers that don't change.
+# Instead, keep a priority queue of cells ordered by how far they are
+# from satisfying the Bellman equation, and always back up the worst
+# one. When a cell's utility changes, the cells that can move into it
+# are queued, with priority the most that change can affect them.
+#
+class PrioritizedSweeping:
+
+    # Constructor
+    #
+    # Works out, once per layout, the predecessors of each cell: every
+    # cell j that can end up in cell i, along with the largest chance,
+    # over j's actions, that it does.
+    def __init__(self, model):
+        self.model = model
+        size = len(model.cells)
+        chances = [{} for i in range(size)]
+        for a, outcomes in enumerate(model.successors):
+            for k, targets in enumerate(outcomes):
+                p = model.probabilities[k]
+                if p == 0:
+                    continue
+                for j in range(size):
+                    key = (j, a)
+                    chances[targets[j]][key] = chances[targets[j]].get(key, 0) + p
+
+        self.predecessors = []
+        for i in range(size):
+            best = {}
+            for (j, a), chance in chances[i].items():
+                best[j] = max(best.get(j, 0), chance)
+            self.predecessors.append(sorted(best.items()))
+
+    # Back up cells in order of Bellman error until no queued cell has
+    # an error of threshold or more, or maxBackups have been done.
+    #
+    # utilities is a list by cell number, updated in place; fixed says
+    # which cells are terminal, and update lists the others. The queue
+    # starts with the cells in seeds, or all of update if that is None.
+    # It also stops once deadline, if given, has passed. Returns the
+    # number of backups done.
+    def solve(self, utilities, fixed, update, rewards, discount, threshold, maxBackups, seeds=None,
+              deadline=None):
+        calculateMEU = self.model.calculateMEU
+        if seeds is None:
+            seeds = update
+
+        # pending holds the current priority of each queued cell; heap
+        # entries that don't match it are out of date and skipped.
+        pending = {}
+        heap = []
+        for i in seeds:
+            error = abs(rewards[i] + discount * calculateMEU(utilities, i) - utilities[i])
+            if error >= threshold:
+                pending[i] = error
+                heap.append((-error, i))
+        heapq.heapify(heap)
+
+        backups = 0
+        while heap and backups < maxBackups:
+            priority, i = heapq.heappop(heap)
+            if pending.get(i) != -priority:
+                continue
+            del pending[i]
+
+            newValue = rewards[i] + discount * calculateMEU(utilities, i)
+            change = abs(newValue - utilities[i])
+            utilities[i] = newValue
+            backups += 1
+
+            for j, chance in self.predecessors[i]:
+                if fixed[j]:
+                    continue
+                impact = pending.get(j, 0) + discount * chance * change
+                if impact >= threshold:
+                    pending[j] = impact
+                    heapq.heappush(heap, (-impact, j))
+            if deadline is not None and deadline.passed():
+                break
+        return backups
+
+#
+# Hierarchical value iteration over corridors and junctions.
+#
+# Big mazes are mostly corridors one cell wide. A corridor cell only
+# has two free neighbours, and in it Pacman can only really head one
+# way, head the other way, or push against a wall and wait, so there
+# is no need to back it up sweep after sweep like any other cell.
+#
+# Instead, every run of corridor cells between two junctions A and B
+# (cells where corridors meet, or that are terminal) becomes a single
+# edge. Dead ends count as corridor too: a run can stop at one, in
+# which case it has no B. For each of those three ways of behaving,
+# the utilities along the run solve a tridiagonal linear system, whose
+# answer is, for each cell k,
+#
+# U(k) = constant + a * U(A) + b * U(B)
+#
+# where the constant is the discounted reward picked up on the way and
+# a and b are the discounted chances of ending up at either end. A
+# corridor cell is worth the best of the three. Value iteration then
+# only needs to back up the junctions, reading the corridor cells next
+# to them off those formulas, and once it has converged every
+# corridor cell is filled in from the same formulas.
+#
+# The three ways of behaving have every cell in a run doing the same
+# thing, and the best policy doesn't always: with a ghost at each end
+# of a short run, the cells at either end do best stepping away from
+# their own ghost, towards each other, and round a bend a cell might
+# do better by changing its mind part way along. Each formula is what
+# one way of behaving is worth, so it can only be too low. So once the
+# corridors are filled in, every corridor cell gets a full Bellman
+# backup, and any run with a cell that the backup raises by more than
+# epsilon is handed back to be swept like the junctions, carrying on
+# from where it got to, until nothing is raised.
+#
+class HierarchicalIteration:
+
+    # The three ways of behaving in a corridor: head for the B end, head
+    # for the A end, or stay put as much as possible.
+    forward, backward, wait = range(3)
+
+    # Constructor
+    #
+    # Finds, once per layout, the chains of corridor cells. Each chain
+    # is a list of cell numbers, starting with a junction and ending
+    # with one (the same one, if the corridor loops back), or with None
+    # at a dead end. A stretch of corridor with no junction on it at all
+    # gets one of its cells, a dead end if it has one, made into a
+    # junction.
+    def __init__(self, model):
+        self.model = model
+        neighbours = model.neighbours
+        size = len(model.cells)
+        self.isJunction = [len(neighbours[i]) not in [1, 2] for i in range(size)]
+
+        self.chains = []
+        seen = [False] * size
+        for i in range(size):
+            if self.isJunction[i]:
+                self.addChains(i, seen)
+        for degree in [1, 2]:
+            for i in range(size):
+                if not seen[i] and not self.isJunction[i] and len(neighbours[i]) == degree:
+                    self.isJunction[i] = True
+                    self.addChains(i, seen)
+
+    # Follow every corridor out of junction i that hasn't been followed
+    # already.
+    def addChains(self, i, seen):
+        neighbours = self.model.neighbours
+        for j in neighbours[i]:
+            if self.isJunction[j] or seen[j]:
+                continue
+            chain = [i]
+            previous, current = i, j
+            while not self.isJunction[current]:
+                seen[current] = True
+                chain.append(current)
+                if len(neighbours[current]) == 1:
+                    current = None
+                    break
+                a, b = neighbours[current]
+                previous, current = current, (b if a == previous else a)
+            chain.append(current)
+            self.chains.append(chain)
+
+    # The chance, doing action number a in cell i, of ending up in each
+    # of back, i itself, and ahead.
+    def chances(self, i, a, back, ahead):
+        result = [0.0, 0.0, 0.0]
+        for targets, p in zip(self.model.successors[a], self.model.probabilities):
+            target = targets[i]
+            if target == back:
+                result[0] += p
+            elif target == ahead:
+                result[2] += p
+            else:
+                result[1] += p
+        return result
+
+    # Solve for the utilities of the cells in a run, when every one of
+    # them behaves the same way. start and end are the junctions at
+    # either end, end being None for a dead end. Returns, for each cell,
+    # (constant, a, b) as above.
+    #
+    # This is the Thomas algorithm for a tridiagonal system, carried out
+    # on three right hand sides at once: one for the reward, and one for
+    # each of U(A) and U(B).
+    def solveRun(self, start, run, end, behaviour, rewards, discount):
+        model = self.model
+        lower, diagonal, upper, rhs = [], [], [], []
+        for k, i in enumerate(run):
+            if k > 0:
+                back = run[k - 1]
+            else:
+                back = start
+            if k < len(run) - 1:
+                ahead = run[k + 1]
+            else:
+                ahead = end
+
+            if behaviour == self.forward:
+                target = ahead
+            elif behaviour == self.backward:
+                target = back
+            else:
+                target = None
+
+            if target is None:
+                # Whichever move is most likely to leave him where he is
+                options = [self.chances(i, a, back, ahead) for a in range(len(model.actions))]
+                chance = max(options, key=lambda option: option[1])
+            else:
+                for a in range(len(model.actions)):
+                    if model.successors[a][0][i] == target:
+                        break
+                chance = self.chances(i, a, back, ahead)
+
+            lower.append(-discount * chance[0])
+            diagonal.append(1 - discount * chance[1])
+            upper.append(-discount * chance[2])
+            right = [rewards[i], 0.0, 0.0]
+            if k == 0:
+                right[1] += discount * chance[0]
+            if k == len(run) - 1:
+                right[2] += discount * chance[2]
+            rhs.append(right)
+
+        # Forward elimination
+        scale = [0.0] * len(run)
+        for k in range(len(run)):
+            if k > 0:
+                pivot = diagonal[k] - lower[k] * scale[k - 1]
+                rhs[k] = [(rhs[k][n] - lower[k] * rhs[k - 1][n]) / pivot for n in range(3)]
+            else:
+                pivot = diagonal[k]
+                rhs[k] = [value / pivot for value in rhs[k]]
+            scale[k] = upper[k] / pivot
+
+        # Back substitution
+        for k in range(len(run) - 2, -1, -1):
+            rhs[k] = [rhs[k][n] - scale[k] * rhs[k + 1][n] for n in range(3)]
+        return [tuple(right) for right in rhs]
+
+    # Split the chains up at terminal cells, and work out the formulas
+    # for every corridor cell that isn't terminal. Returns a dictionary
+    # from cell number to (start, end, formulas), and the runs, as
+    # lists of cell numbers.
+    def buildEdges(self, fixed, rewards, discount):
+        edges = {}
+        runs = []
+        for chain in self.chains:
+            start = 0
+            for k in range(1, len(chain)):
+                if k < len(chain) - 1 and not fixed[chain[k]]:
+                    continue
+                run = chain[start + 1:k]
+                if run:
+                    solutions = [self.solveRun(chain[start], run, chain[k], behaviour, rewards, discount)
+                                 for behaviour in (self.forward, self.backward, self.wait)]
+                    # Nothing reaches past a dead end, so b is always 0
+                    # there, and which cell it multiplies doesn't matter
+                    end = chain[k]
+                    if end is None:
+                        end = chain[start]
+                    for n, i in enumerate(run):
+                        edges[i] = (chain[start], end, [solution[n] for solution in solutions])
+                    runs.append(run)
+                start = k
+        return edges, runs
+
+    # The utility of a corridor cell, given its edge from buildEdges and
+    # the utilities at the ends of its run.
+    def corridorUtility(self, utilities, edge):
+        start, end, formulas = edge
+        return max(constant + a * utilities[start] + b * utilities[end]
+                   for constant, a, b in formulas)
+
+    # Run value iteration on the junctions, Gauss-Seidel style, until no
+    # junction changes by epsilon or more, or for at most loops sweeps
+    # in all, then fill in the corridors and check them. Any run that
+    # fails the check has its cells swept along with the junctions from
+    # then on, and it all starts again. If deadline is given, the
+    # junctions also stop once it has passed, and the corridors are
+    # filled in but not checked.
+    #
+    # utilities is a list by cell number, updated in place; fixed says
+    # which cells are terminal and update lists the others, as for the
+    # other solvers. Returns the number of sweeps and the number of
+    # backups: one per junction per sweep (reading the corridor cells
+    # next to it off their formulas is part of that), and two per
+    # corridor cell each time they are filled in and checked.
+    def solve(self, utilities, fixed, update, rewards, discount, loops, epsilon, deadline=None):
+        calculateMEU = self.model.calculateMEU
+        edges, runs = self.buildEdges(fixed, rewards, discount)
+        sweeps = 0
+        backups = 0
+        while True:
+            used, done = self.solveJunctions(utilities, update, edges, rewards, discount, loops - sweeps, epsilon,
+                                             deadline)
+            sweeps += used
+            backups += done
+            if deadline is not None and deadline.passed():
+                break
+
+            failed = []
+            for run in runs:
+                for i in run:
+                    if rewards[i] + discount * calculateMEU(utilities, i) - utilities[i] > epsilon:
+                        failed.append(run)
+                        break
+            backups += len(edges)
+            if not failed or sweeps >= loops:
+                break
+            for run in failed:
+                runs.remove(run)
+                for i in run:
+                    del edges[i]
+        return sweeps, backups
+
+    # The sweeps for solve(): every cell in update that isn't in edges
+    # is backed up as usual, and the rest are filled in at the end.
+    # Returns the number of sweeps and backups.
+    def solveJunctions(self, utilities, update, edges, rewards, discount, loops, epsilon, deadline):
+        calculateMEU = self.model.calculateMEU
+        junctions = [i for i in update if i not in edges]
+
+        # The corridor cells next to a junction, which are the only ones
+        # the junction backups read
+        gateways = set()
+        for i in junctions:
+            for j in self.model.neighbours[i]:
+                if j in edges:
+                    gateways.add(j)
+        gateways = sorted(gateways)
+
+        sweeps = 0
+        backups = 0
+        while loops > 0:
+            for j in gateways:
+                utilities[j] = self.corridorUtility(utilities, edges[j])
+            residual = 0
+            for i in junctions:
+                newValue = rewards[i] + discount * calculateMEU(utilities, i)
+                residual = max(residual, abs(newValue - utilities[i]))
+                utilities[i] = newValue
+            backups += len(junctions)
+            sweeps += 1
+            loops -= 1
+            if residual < epsilon:
+                break
+            if deadline is not None and deadline.passed():
+                break
+
+        for i, edge in edges.items():
+            utilities[i] = self.corridorUtility(utilities, edge)
+        backups += len(edges)
+        return sweeps, backups
+
+#
+# Value iteration split into tiles, run across a pool of processes.
+#
+# The board is cut into square tiles. In each round every tile, in its
+# own worker, does a few Gauss-Seidel sweeps over its own cells, with
+# the cells just outside it (its halo) held at their values from the
+# start of the round. Then the new values are swapped in, so each tile
+# sees its neighbours' progress in the next round, and rounds go on
+# until a round starts with no cell off by epsilon or more.
+#
+# The board lives in shared memory: two buffers of utilities (one read
+# from and one written to in each round, so the answer doesn't depend
+# on which worker runs first), the rewards and the terminal flags. The
+# workers are given these when the pool starts, so each round only
+# sends them a tile number. A tile only copies its own cells and its
+# halo out of the buffer, so a round costs as much as the board, not
+# the board for every tile.
+#
+
+# What each worker process knows, set up by startWorker.
+workerState = {}
+
+def startWorker(model, tiles, regions, buffers, rewards, isFixed):
+    workerState['model'] = model
+    workerState['tiles'] = tiles
+    workerState['regions'] = regions
+    workerState['buffers'] = buffers
+    workerState['rewards'] = rewards
+    workerState['isFixed'] = isFixed
+
+# One round for one tile. Reads the buffer numbered source and writes
+# the tile's cells into the other one. Returns the largest change made
+# by the first sweep, which is the tile's Bellman error at the start
+# of the round, and the number of backups done.
+def sweepTile(job):
+    tile, source, discount, sweeps = job
+    calculateMEU = workerState['model'].calculateMEU
+    rewards = workerState['rewards']
+    isFixed = workerState['isFixed']
+    current = workerState['buffers'][source]
+    target = workerState['buffers'][1 - source]
+
+    cells = [i for i in workerState['tiles'][tile] if not isFixed[i]]
+    # The tile and its halo, by cell number, which is all that the
+    # backups read
+    utilities = dict((i, current[i]) for i in workerState['regions'][tile])
+    error = 0
+    for k in range(sweeps):
+        for i in cells:
+            newValue = rewards[i] + discount * calculateMEU(utilities, i)
+            if k == 0:
+                error = max(error, abs(newValue - utilities[i]))
+            utilities[i] = newValue
+    for i in cells:
+        target[i] = utilities[i]
+    return error, sweeps * len(cells)
+
+class TiledIteration:
+
+    # Constructor
+    #
+    # tileSize is the width and height of each tile, in cells, and
+    # processes the number of workers, one per CPU by default. The pool
+    # is started here, once per layout, and should be shut down with
+    # close() at the end of the game.
+    def __init__(self, model, tileSize=16, processes=None):
+        self.model = model
+        tiles = {}
+        for i, (x, y) in enumerate(model.cells):
+            tiles.setdefault((x // tileSize, y // tileSize), []).append(i)
+        self.tiles = [array('i', tiles[key]) for key in sorted(tiles.keys())]
+
+        # Each tile's cells and the cells next to them outside it
+        self.regions = []
+        for tile in self.tiles:
+            region = set(tile)
+            for i in tile:
+                region.update(model.neighbours[i])
+            self.regions.append(array('i', sorted(region)))
+
+        size = len(model.cells)
+        self.buffers = [multiprocessing.sharedctypes.RawArray('d', size),
+                        multiprocessing.sharedctypes.RawArray('d', size)]
+        self.rewards = multiprocessing.sharedctypes.RawArray('d', size)
+        self.isFixed = multiprocessing.sharedctypes.RawArray('b', size)
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(processes, startWorker,
+                                         (model, self.tiles, self.regions, self.buffers, self.rewards,
+                                          self.isFixed))
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    # Run rounds of tileSweeps sweeps per tile until the Bellman error
+    # is below epsilon, for at most loops rounds, or until deadline, if
+    # given, has passed.
+    #
+    # utilities is a list by cell number, updated in place, and fixed
+    # says which cells are terminal, as for the other solvers. Returns
+    # the number of sweeps and of backups done.
+    def solve(self, utilities, fixed, rewards, discount, loops, epsilon, tileSweeps=4, deadline=None):
+        self.buffers[0][:] = utilities
+        self.buffers[1][:] = utilities
+        self.rewards[:] = rewards
+        self.isFixed[:] = [int(flag) for flag in fixed]
+
+        source = 0
+        sweeps = 0
+        backups = 0
+        while loops > 0:
+            jobs = [(tile, source, discount, tileSweeps) for tile in range(len(self.tiles))]
+            results = self.pool.map(sweepTile, jobs)
+            source = 1 - source
+            sweeps += tileSweeps
+            backups += sum(done for error, done in results)
+            loops -= 1
+            if max(error for error, done in results) < epsilon:
+                break
+            if deadline is not None and deadline.passed():
+                break
+
+        utilities[:] = self.buffers[source][:]
+        return sweeps, backups
+
+#
+# A receding-horizon window.
+#
+# On a big board most of the cells are a long way from Pacman, and
+# their utilities barely affect which way he should go next. So only
+# solve the MDP in a window of cells near Pacman, within radius steps
+# either as the crow flies ("manhattan") or along corridors ("maze").
+# Cells just outside the window are held at a heuristic value, so that
+# Pacman is still drawn towards food that lies beyond it.
+#
+# The heuristic is a distance-discounted food density,
+#
+# foodReward * sum over food f of discount ** distance(cell, f)
+#
+# capped at foodReward, and never below the utility of just wandering
+# about, reward / (1 - discount). The sums are worked out once per
+# layout, and a pellet's share is taken off again when it is eaten.
+#
+class LocalWindow:
+
+    def __init__(self, model, radius, metric="manhattan"):
+        if metric not in ["manhattan", "maze"]:
+            raise Exception("Unknown window metric: " + str(metric))
+        self.model = model
+        self.radius = radius
+        self.metric = metric
+        self.density = [0.0] * len(model.cells)
+        self.food = set()
+
+    # Work out the density for every cell, from the food at the start
+    # of the game.
+    def buildHeuristic(self, food, foodReward, reward, discount):
+        self.foodReward = foodReward
+        self.restValue = reward / (1.0 - discount)
+        self.discount = discount
+        self.density = [0.0] * len(self.model.cells)
+        self.food = set()
+        for pellet in food:
+            self.addFood(pellet, 1)
+
+    def addFood(self, pellet, sign):
+        px, py = pellet
+        discount = self.discount
+        density = self.density
+        for i, (x, y) in enumerate(self.model.cells):
+            density[i] += sign * discount ** (abs(x - px) + abs(y - py))
+        if sign > 0:
+            self.food.add(pellet)
+        else:
+            self.food.discard(pellet)
+
+    # Take eaten pellets out of the density.
+    def updateFood(self, food):
+        for pellet in self.food - set(food):
+            self.addFood(pellet, -1)
+
+    def heuristic(self, i):
+        return max(self.restValue, min(self.foodReward, self.foodReward * self.density[i]))
+
+    # The cell numbers in the window around cell i.
+    def cells(self, i):
+        if self.metric == "maze":
+            # Breadth first search out to the radius
+            depth = {i: 0}
+            frontier = [i]
+            while frontier:
+                next = []
+                for j in frontier:
+                    if depth[j] == self.radius:
+                        continue
+                    for k in self.model.neighbours[j]:
+                        if k not in depth:
+                            depth[k] = depth[j] + 1
+                            next.append(k)
+                frontier = next
+            return sorted(depth.keys())
+        else:
+            x, y = self.model.cells[i]
+            index = self.model.index
+            window = []
+            for dx in range(-self.radius, self.radius + 1):
+                span = self.radius - abs(dx)
+                for dy in range(-span, span + 1):
+                    j = index.get((x + dx, y + dy))
+                    if j is not None:
+                        window.append(j)
+            return sorted(window)
+
+    # Cut a problem down to the window around cell i. Every cell outside
+    # the window becomes fixed, and those on its edge that aren't already
+    # terminal take their heuristic value. Returns the new fixed and
+    # update lists; utilities is changed in place.
+    def restrict(self, i, utilities, fixed, update):
+        window = self.cells(i)
+        inside = set(window)
+        newFixed = [True] * len(fixed)
+        for j in window:
+            newFixed[j] = fixed[j]
+            for k in self.model.neighbours[j]:
+                if k not in inside and not fixed[k]:
+                    utilities[k] = self.heuristic(k)
+        return newFixed, [j for j in window if not fixed[j]]
+
+#
+# A threat field around the ghosts.
+#
+# The ghosts are terminal cells worth -10, but that only tells Pacman
+# about the cell a ghost is on right now. The threat field spreads a
+# penalty out from each ghost, halving (by default) with every step
+# along the corridors, out to some radius, so that it can be taken off
+# the reward for being in each cell.
+#
+# A scared ghost can't hurt Pacman until its timer runs out, so it is
+# treated as if it were that many steps further away. That turns the
+# field into a single breadth first search from all the ghosts at
+# once, in which each ghost only joins the search at the depth given
+# by its timer, and every cell gets the penalty for its depth the
+# first time it is reached.
+#
+class ThreatField:
+
+    def __init__(self, model, penalty=1.0, decay=0.5, radius=5):
+        self.model = model
+        self.penalty = penalty
+        self.decay = decay
+        self.radius = radius
+
+    # The threat to each cell, a list by cell number, from ghostStates
+    # as given by api.ghostStatesWithTimes. Ghosts between two cells
+    # count as being on the one they have left, as in createMapValues.
+    def compute(self, ghostStates):
+        index = self.model.index
+        neighbours = self.model.neighbours
+
+        # Which cells each depth of the search starts from
+        starts = [[] for depth in range(self.radius + 1)]
+        for (x, y), timer in ghostStates:
+            i = index.get((int(x), int(y)))
+            if i is not None and timer <= self.radius:
+                starts[int(timer)].append(i)
+
+        threat = [0.0] * len(self.model.cells)
+        reached = [False] * len(self.model.cells)
+        frontier = []
+        for depth in range(self.radius + 1):
+            level = []
+            for i in frontier + starts[depth]:
+                if not reached[i]:
+                    reached[i] = True
+                    threat[i] = self.penalty * self.decay ** depth
+                    level.append(i)
+            frontier = [j for i in level for j in neighbours[i] if not reached[j]]
+        return threat
+
+# A name for a layout, from its size and walls, that stays the same
+# from one run to the next.
+def layoutHash(model):
+    return hashlib.md5(repr((model.width, model.height, sorted(model.walls)))).hexdigest()
+
+# A set of (x, y) cells as a bitset, one bit per cell number.
+def bitset(model, cells):
+    bits = 0
+    for cell in cells:
+        bits |= 1 << model.index[cell]
+    return bits
+
+#
+# A cache of solved utilities, kept from one game to the next.
+#
+# Running many games on the same layout means solving the same MDP
+# from scratch at the start of every one of them. So whenever a move
+# is solved, its utilities are kept, keyed by the layout and by which
+# cells still hold food and capsules, and the next game that reaches
+# the same position can start from them.
+#
+# Only the most recently used entries are kept, size of them at most.
+# If a file name is given, the cache is loaded from it when it is made
+# and written back by save(), so it carries over between runs of
+# pacman.py too.
+#
+class UtilityCache:
+
+    def __init__(self, size=256, path=None):
+        self.size = size
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            f = file(path, 'rb')
+            self.entries = cPickle.load(f)
+            f.close()
+            self.trim()
+
+    # The key for a position: the layout's hash, and the food and
+    # capsules as bitsets.
+    def key(self, layout, model, food, capsules):
+        return (layout, bitset(model, food), bitset(model, capsules))
+
+    # The utilities, terminal rewards and rewards for being in each cell
+    # stored under key, or None. A hit makes the entry the most recently
+    # used one.
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        utilities, rewards, cellRewards = self.entries.pop(key)
+        self.entries[key] = (utilities, rewards, cellRewards)
+        return utilities[:], dict(rewards), cellRewards[:]
+
+    def put(self, key, utilities, rewards, cellRewards):
+        if key in self.entries:
+            del self.entries[key]
+        self.entries[key] = (utilities[:], dict(rewards), cellRewards[:])
+        self.trim()
+
+    # Drop the least recently used entries until there are at most size.
+    def trim(self):
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        if self.path is None:
+            return
+        f = file(self.path, 'wb')
+        cPickle.dump(self.entries, f, 2)
+        f.close()
+
+#
+# Compiled policy tables.
+#
+# On a board without ghosts, the best move only depends on where
+# Pacman is and which food and capsules are left. mdpCompiler.py works
+# the policy out ahead of time for the positions a game can reach, and
+# keeps it in a PolicyTable: for each set of food and capsules left (as
+# a pair of bitsets), the number of the action to take in each cell,
+# packed four cells to a byte.
+#
+# A table is no use for any other layout, or for other rewards, so it
+# records the hash of the layout and the parameters it was compiled
+# with, and MDPAgent checks both before using it.
+#
+class PolicyTable:
+
+    # Changes whenever the file format does
+    version = 1
+
+    def __init__(self, layout, parameters):
+        self.layout = layout
+        self.parameters = parameters
+        self.policies = {}
+
+    def matches(self, layout, parameters):
+        return self.layout == layout and self.parameters == parameters
+
+    # Store the policy for key, given as one action number per cell.
+    def add(self, key, actions):
+        packed = bytearray((len(actions) + 3) // 4)
+        for i, a in enumerate(actions):
+            packed[i >> 2] |= a << ((i & 3) * 2)
+        self.policies[key] = str(packed)
+
+    # The action number for cell i under the policy for key, or None if
+    # there isn't one.
+    def lookup(self, key, i):
+        packed = self.policies.get(key)
+        if packed is None:
+            return None
+        return (ord(packed[i >> 2]) >> ((i & 3) * 2)) & 3
+
+    def save(self, path):
+        f = file(path, 'wb')
+        cPickle.dump({'version': self.version, 'layout': self.layout,
+                      'parameters': self.parameters, 'policies': self.policies}, f, 2)
+        f.close()
+
+def loadPolicyTable(path):
+    f = file(path, 'rb')
+    contents = cPickle.load(f)
+    f.close()
+    if contents.get('version') != PolicyTable.version:
+        raise Exception("Policy table " + path + " is in an old format, compile it again")
+    table = PolicyTable(contents['layout'], contents['parameters'])
+    table.policies = contents['policies']
+    return table
+
+#
+# Where the time goes.
+#
+# MDPAgent times each phase of every move (waiting for the background
+# planner, printing the map, building the map values, solving and
+# picking the action) and records how many sweeps and backups solving
+# took and how far from solved the utilities were left. MoveStatistics
+# keeps those for every move of every game, and sums them up per game
+# and over all of them.
+#
+class MoveStatistics:
+
+    phases = ["planner", "display", "map", "solve", "action"]
+
+    def __init__(self):
+        self.games = []
+        self.moves = []
+        self.move = None
+        self.started = None
+
+    # The clock the phases are timed with.
+    def clock(self):
+        return timeit.default_timer()
+
+    def startMove(self):
+        self.move = dict((phase, 0.0) for phase in self.phases)
+        self.move['sweeps'] = 0
+        self.move['backups'] = 0
+        self.move['residual'] = None
+        self.started = self.clock()
+
+    # Add the time since the last phase ended to phase.
+    def endPhase(self, phase):
+        now = self.clock()
+        self.move[phase] += now - self.started
+        self.started = now
+
+    def endMove(self, sweeps, backups, residual):
+        self.move['sweeps'] = sweeps
+        self.move['backups'] = backups
+        self.move['residual'] = residual
+        self.moves.append(self.move)
+        self.move = None
+
+    def endGame(self, score, win):
+        summary = self.summarise(self.moves)
+        summary['game'] = len(self.games) + 1
+        summary['score'] = score
+        summary['win'] = win
+        self.games.append((summary, self.moves))
+        self.moves = []
+        return summary
+
+    # Totals, means and maxima over a list of moves. Moves that were
+    # looked up rather than solved have no residual.
+    def summarise(self, moves):
+        summary = {'moves': len(moves),
+                   'sweeps': sum(move['sweeps'] for move in moves),
+                   'backups': sum(move['backups'] for move in moves)}
+        residuals = [move['residual'] for move in moves if move['residual'] is not None]
+        summary['meanResidual'] = sum(residuals) / len(residuals) if residuals else None
+        summary['maxResidual'] = max(residuals) if residuals else None
+        for phase in self.phases:
+            times = [move[phase] for move in moves]
+            summary[phase + 'Total'] = sum(times)
+            summary[phase + 'Mean'] = sum(times) / len(times) if times else 0.0
+            summary[phase + 'Max'] = max(times) if times else 0.0
+        return summary
+
+    # Everything over all the games so far.
+    def overall(self):
+        summary = self.summarise([move for game, moves in self.games for move in moves])
+        summary['game'] = 'all'
+        summary['score'] = sum(game['score'] for game, moves in self.games) / float(max(len(self.games), 1))
+        summary['win'] = sum(1 for game, moves in self.games if game['win'])
+        return summary
+
+    # Write the summaries to path, as CSV, one row per game and a last
+    # one for all of them, if it ends in .csv, and otherwise as JSON
+    # with the moves of each game too.
+    def save(self, path):
+        if path.endswith('.csv'):
+            columns = ['game', 'score', 'win', 'moves', 'sweeps', 'backups', 'meanResidual', 'maxResidual']
+            for phase in self.phases:
+                columns += [phase + 'Total', phase + 'Mean', phase + 'Max']
+            f = file(path, 'wb')
+            writer = csv.DictWriter(f, columns)
+            writer.writerow(dict((column, column) for column in columns))
+            for game, moves in self.games:
+                writer.writerow(game)
+            writer.writerow(self.overall())
+            f.close()
+        else:
+            f = file(path, 'w')
+            json.dump({'games': [dict(game, perMove=moves) for game, moves in self.games],
+                       'overall': self.overall()}, f, indent=1, sort_keys=True)
+            f.close()
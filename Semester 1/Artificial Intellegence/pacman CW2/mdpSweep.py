@@ -0,0 +1,246 @@
+# mdpSweep.py
+# robinson/09-dec-2018
+#
+# Tries MDPAgent out with every combination of a set of rewards and
+# discounts, on one or more layouts, to find the one that does best:
+#
+# python mdpSweep.py -l smallGrid,mediumClassic -s discount=0.7,0.8,0.9 -s ghostReward=-10,-50 -n 200
+#
+# Each -s gives an agent option (see MDPAgent) and the values to try
+# for it. Games are played in rounds of --batch games per combination
+# and layout, spread over a pool of processes, each round with the
+# same random seeds for every combination so that they are compared
+# on the same games. Each game has its own random streams (see
+# randomStreams.py), so the ghosts and Pacman's slips draw the same
+# numbers for every combination, however differently they play. After
+# each round, every combination has its win rate and average score
+# worked out, with 95% confidence intervals, and any whose interval
+# lies wholly below that of the best one is dropped. The rest carry
+# on until they have played -n games each (per layout), or only one is
+# left.
+#
+# The agents run inside the pool's processes, which can't have pools
+# of their own, so solver=tiled can't be used here.
+#
+# As required by the licensing agreement for the PacMan AI we have:
+#
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+from mdpAgents import MDPAgent
+from optparse import OptionParser
+from pacman import ClassicGameRules
+import csv
+import ghostAgents
+import itertools
+import layout
+import math
+import multiprocessing
+import os
+import pacman
+import randomStreams
+import sys
+import textDisplay
+
+# The number of standard deviations either side of the mean for a 95%
+# confidence interval.
+z = 1.96
+
+# Play games games of layoutName with an MDPAgent given options, from
+# random seed seed, and return the score and whether it was won for
+# each. Game i draws from the streams for game i of seed. All the
+# agent's printing is thrown away.
+def playGames(job):
+    layoutName, options, seed, games, ghostType, timeout = job
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        board = layout.getLayout(layoutName)
+        agent = MDPAgent(**options)
+        ghosts = [getattr(ghostAgents, ghostType)(i + 1) for i in range(board.getNumGhosts())]
+        rules = ClassicGameRules(timeout)
+        results = []
+        for i in range(games):
+            streams = randomStreams.RandomStreams(seed, i)
+            game = rules.newGame(board, agent, ghosts, textDisplay.NullGraphics(), True, streams=streams)
+            game.run()
+            results.append((game.state.getScore(), game.state.isWin()))
+        return results
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+# 95% confidence interval for a win rate of wins out of games, by
+# Wilson's method, which behaves itself near 0 and 1.
+def winInterval(wins, games):
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / float(games)
+    centre = p + z * z / (2 * games)
+    spread = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games))
+    scale = 1 + z * z / games
+    return max(0.0, (centre - spread) / scale), min(1.0, (centre + spread) / scale)
+
+# 95% confidence interval for the mean of scores.
+def scoreInterval(scores):
+    n = len(scores)
+    mean = sum(scores) / float(n)
+    if n < 2:
+        return mean, float("-inf"), float("inf")
+    variance = sum((score - mean) ** 2 for score in scores) / (n - 1)
+    spread = z * math.sqrt(variance / n)
+    return mean, mean - spread, mean + spread
+
+# The results so far for one combination of options.
+class Candidate:
+
+    def __init__(self, options):
+        self.options = options
+        self.scores = []
+        self.wins = 0
+        self.droppedAfter = None
+
+    def add(self, results):
+        for score, win in results:
+            self.scores.append(score)
+            if win:
+                self.wins += 1
+
+    def games(self):
+        return len(self.scores)
+
+    def winRate(self):
+        return self.wins / float(max(self.games(), 1))
+
+    # The interval of whichever measure the sweep is judged by.
+    def interval(self, metric):
+        if metric == "win":
+            return winInterval(self.wins, self.games())
+        mean, low, high = scoreInterval(self.scores)
+        return low, high
+
+    def name(self, names):
+        return ",".join("%s=%s" % (name, self.options[name]) for name in names)
+
+# Every combination of the values in grid, a list of (option, values).
+def combinations(grid):
+    names = [name for name, values in grid]
+    return [dict(zip(names, values)) for values in itertools.product(*[values for name, values in grid])]
+
+def sweep(layouts, grid, agentOptions, maxGames, batch, processes, metric, minGames, ghostType, timeout, seed):
+    names = [name for name, values in grid]
+    candidates = []
+    for options in combinations(grid):
+        candidates.append(Candidate(options))
+    live = candidates[:]
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        rounds = 0
+        played = 0
+        while played < maxGames and (len(live) > 1 or live == candidates):
+            games = min(batch, maxGames - played)
+            jobs = []
+            for candidate in live:
+                for number, layoutName in enumerate(layouts):
+                    options = dict(agentOptions)
+                    options.update(candidate.options)
+                    jobs.append((layoutName, options, (seed, rounds, number), games, ghostType, timeout))
+            results = pool.map(playGames, jobs, 1)
+            for i, candidate in enumerate(live):
+                for number in range(len(layouts)):
+                    candidate.add(results[i * len(layouts) + number])
+            played += games
+            rounds += 1
+
+            # Drop whatever is clearly worse than the best so far
+            if played >= minGames and len(live) > 1:
+                bestLow = max(candidate.interval(metric)[0] for candidate in live)
+                for candidate in live:
+                    if candidate.interval(metric)[1] < bestLow:
+                        candidate.droppedAfter = candidate.games()
+                live = [candidate for candidate in live if candidate.droppedAfter is None]
+            print "Round", rounds, "-", played, "games each,", len(live), "of", len(candidates), "left"
+    finally:
+        pool.close()
+        pool.join()
+    return names, candidates
+
+# Print the results, best first, and write them to path as CSV if given.
+def report(names, candidates, metric, path=None):
+    def order(candidate):
+        if metric == "win":
+            return (candidate.droppedAfter is None, candidate.winRate())
+        return (candidate.droppedAfter is None, scoreInterval(candidate.scores)[0])
+    candidates = sorted(candidates, key=order, reverse=True)
+
+    rows = []
+    for candidate in candidates:
+        winLow, winHigh = winInterval(candidate.wins, candidate.games())
+        score, scoreLow, scoreHigh = scoreInterval(candidate.scores)
+        rows.append([candidate.name(names), candidate.games(), candidate.winRate(), winLow, winHigh,
+                     score, scoreLow, scoreHigh, candidate.droppedAfter])
+        dropped = ""
+        if candidate.droppedAfter is not None:
+            dropped = "  dropped after %d games" % candidate.droppedAfter
+        print "%-40s %5d games  win %.2f [%.2f, %.2f]  score %8.1f [%.1f, %.1f]%s" % (
+            candidate.name(names), candidate.games(), candidate.winRate(), winLow, winHigh,
+            score, scoreLow, scoreHigh, dropped)
+
+    if path is not None:
+        f = file(path, 'wb')
+        writer = csv.writer(f)
+        writer.writerow(["options", "games", "winRate", "winLow", "winHigh", "score", "scoreLow", "scoreHigh",
+                         "droppedAfter"])
+        writer.writerows(rows)
+        f.close()
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="python mdpSweep.py -l LAYOUTS -s OPTION=VALUE,VALUE... [options]")
+    parser.add_option('-l', '--layouts', dest='layouts', default='mediumClassic',
+                      help='layouts to play, separated by commas')
+    parser.add_option('-s', '--sweep', dest='sweep', action='append', default=[],
+                      help='an MDPAgent option and the values to try for it, as OPTION=VALUE,VALUE...')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs', default=None,
+                      help='options for the MDPAgent that stay the same, as for pacman.py')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=100,
+                      help='most games for each combination on each layout')
+    parser.add_option('-b', '--batch', dest='batch', type='int', default=10,
+                      help='games for each combination on each layout in a round')
+    parser.add_option('--minGames', dest='minGames', type='int', default=20,
+                      help='games to play before dropping any combination')
+    parser.add_option('-p', '--processes', dest='processes', type='int', default=None,
+                      help='processes to play games in (one per CPU if not given)')
+    parser.add_option('-m', '--metric', dest='metric', default='win', choices=['win', 'score'],
+                      help='what to compare combinations by, "win" rate or "score"')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='the ghost agent TYPE in the ghostAgents module to use')
+    parser.add_option('--timeout', dest='timeout', type='int', default=30,
+                      help='the time allowed for each move, as for pacman.py')
+    parser.add_option('--seed', dest='seed', default='cs188',
+                      help='the random seed the games are played from')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='CSV file to write the results to')
+    options, otherjunk = parser.parse_args(sys.argv[1:])
+
+    grid = []
+    for option in options.sweep:
+        if '=' not in option:
+            parser.error("-s needs OPTION=VALUE,VALUE..., not " + option)
+        name, values = option.split('=', 1)
+        grid.append((name, values.split(',')))
+    agentOptions = pacman.parseAgentArgs(options.agentArgs)
+    agentOptions['showMap'] = agentOptions.get('showMap', 'False')
+
+    names, candidates = sweep(options.layouts.split(','), grid, agentOptions, options.numGames, options.batch,
+                                  options.processes, options.metric, options.minGames, options.ghost,
+                                  options.timeout, options.seed)
+    report(names, candidates, options.metric, options.output)
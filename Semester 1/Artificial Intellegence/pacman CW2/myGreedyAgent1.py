@@ -192,7 +192,7 @@ class MyGreedyAgent1(Agent):
             legal.remove(Directions.STOP)
         # Random choice between the legal options.       
                
-        randomChoice = api.makeMove(random.choice(legal), legal)
+        randomChoice = api.makeMove(random.choice(legal), legal, state)
 
         if randomChoice == Directions.EAST:
                 print "0.8 Of East"
@@ -45,7 +45,7 @@ from game import Directions
 from game import Actions
 from util import nearestPoint
 from util import manhattanDistance
-import util, layout
+import util, layout, randomStreams
 import sys, types, time, random, os
 
 ###################################################
@@ -271,11 +271,20 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, streams=None):
+        """
+        streams is a randomStreams.RandomStreams for the game's motion
+        and ghosts to draw from, or None for the random module. Pacman
+        agents make their own choices with the random module, so with
+        streams that is seeded for the game too.
+        """
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize( layout, len(ghostAgents) )
         game = Game(agents, display, self, catchExceptions=catchExceptions)
+        initState.data.streams = streams
+        if streams is not None:
+            random.seed( streams.agentSeed() )
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -509,6 +518,9 @@ def readCommand( argv ):
                       help=default('Zoom the size of the graphics window'), default=1.0)
     parser.add_option('-f', '--fixRandomSeed', action='store_true', dest='fixRandomSeed',
                       help='Fixes the random seed to always play the same game', default=False)
+    parser.add_option('--seed', dest='seed',
+                      help='Plays each game from its own random streams, made from SEED (see randomStreams.py)',
+                      default=None)
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
                       help='Writes game histories to a file (named by the time they were played)', default=False)
     parser.add_option('--replay', dest='gameToReplay',
@@ -570,6 +582,7 @@ def readCommand( argv ):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['seed'] = options.seed
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -625,7 +638,7 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, seed=None ):
     import __main__
     __main__.__dict__['_display'] = display
 
@@ -642,7 +655,10 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         else:
             gameDisplay = display
             rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
+        streams = None
+        if seed is not None:
+            streams = randomStreams.RandomStreams(seed, i)
+        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions, streams)
         game.run()
         if not beQuiet: games.append(game)
 
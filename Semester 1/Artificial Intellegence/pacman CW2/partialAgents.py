@@ -141,5 +141,5 @@ class PartialAgent(Agent):
 			if not distanceFromGhost == "x":
 				#Setting last distance to be distance from ghost on move
 				self.lastDistanceFromGhost = distanceFromGhost
-			return api.makeMove(self.last, legal)
+			return api.makeMove(self.last, legal, state)
 					
\ No newline at end of file
@@ -0,0 +1,154 @@
+# randomStreams.py
+# robinson/09-dec-2018
+#
+# Separate random number streams for the parts of a game that are left
+# to chance, so that games can be played again exactly, one at a time
+# or spread over many processes.
+#
+# Everything random in a game used to come from the random module, so
+# the only way to repeat a game was random.seed(), and then only if
+# every game before it was played again too, in the same order, with
+# nothing else drawing numbers in between. Here, a master seed and the
+# number of the game give each part of the game a stream of its own:
+#
+# streams = randomStreams.RandomStreams('cs188', 3)
+# game = rules.newGame(layout, pacman, ghosts, display, streams=streams)
+#
+# The streams are named:
+#
+# motion   - whether Pacman goes the way he chose (api.makeMove)
+# ghost1.. - the moves each ghost picks (ghostAgents.GhostAgent)
+#
+# and anything else can ask for a stream under a name of its own. The
+# same seed, game and name always give the same numbers, whatever else
+# is drawn from the other streams, or by other games.
+#
+# The motion stream is drawn from on every move, and only ever for
+# uniform numbers, so it is a BlockSampler: it draws them from NumPy a
+# block at a time, and hands them out one by one with random(), or
+# many at once with draw(n).
+#
+# ClassicGameRules.newGame() puts the streams in the game's state,
+# where every state that follows from it, and every copy the agents
+# are given, can find them, with stream(state, name). A game made
+# without any gets the random module instead, so that random.seed()
+# (pacman.py -f) works as it always has.
+#
+# Pacman agents make their own choices, such as random.choice(legal),
+# with the random module, and there are too many of them to change.
+# So newGame() also seeds the random module from agentSeed(), which,
+# like the streams, only depends on the master seed and the game.
+#
+# As required by the licensing agreement for the PacMan AI we have:
+#
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+import hashlib
+import random
+
+# NumPy is optional. Without it, BlockSampler fills its blocks one
+# number at a time.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The seed for stream name of game number game under master seed seed,
+# as a number that fits NumPy's seeds as well as random.Random's.
+def streamSeed(seed, game, name):
+    return int(hashlib.md5(repr((seed, game, name))).hexdigest()[:8], 16)
+
+class RandomStreams:
+
+    # Streams that are drawn from many times, and only ever need
+    # random(), are drawn in blocks
+    blocks = ("motion",)
+
+    def __init__(self, seed, game=0, blockSize=1024):
+        self.seed = seed
+        self.game = game
+        self.blockSize = blockSize
+        self.streams = {}
+
+    # The streams for game number game, from the same master seed.
+    def forGame(self, game):
+        return RandomStreams(self.seed, game, self.blockSize)
+
+    # A seed for the random module, for the agents in this game.
+    def agentSeed(self):
+        return streamSeed(self.seed, self.game, "agent")
+
+    # The stream called name: a BlockSampler for the names in blocks,
+    # otherwise a random.Random, so it has random(), choice(), shuffle()
+    # and the rest, just like the random module.
+    def stream(self, name):
+        if name not in self.streams:
+            seed = streamSeed(self.seed, self.game, name)
+            if name in self.blocks:
+                self.streams[name] = BlockSampler(seed, self.blockSize)
+            else:
+                self.streams[name] = random.Random(seed)
+        return self.streams[name]
+
+class BlockSampler:
+
+    # Hands out uniform numbers in [0, 1) one at a time, like
+    # random.random(), from a block of blockSize of them drawn all in
+    # one go, and draws the next block when that runs out.
+
+    def __init__(self, seed, blockSize=1024):
+        self.blockSize = blockSize
+        if np is not None:
+            self.generator = np.random.RandomState(seed)
+        else:
+            self.generator = random.Random(seed)
+        self.block = []
+        self.next = 0
+
+    def random(self):
+        if self.next == len(self.block):
+            self.block = self.sample(self.blockSize)
+            self.next = 0
+        value = self.block[self.next]
+        self.next += 1
+        return value
+
+    # n numbers at once, as a list: the same ones that n calls to
+    # random() would have given.
+    def draw(self, n):
+        numbers = self.block[self.next:self.next + n]
+        self.next += len(numbers)
+        if len(numbers) < n:
+            numbers += self.sample(n - len(numbers))
+        return numbers
+
+    # n new numbers straight from the generator.
+    def sample(self, n):
+        if np is not None:
+            return self.generator.random_sample(n).tolist()
+        return [self.generator.random() for i in range(n)]
+
+def stream(state, name):
+    # Returns the stream called name for the game that state belongs
+    # to, or the random module itself if that game doesn't have streams
+    # of its own, or there is no state.
+    if state is None or state.data.streams is None:
+        return random
+    return state.data.streams.stream(name)
+
+def draw(state, name, n):
+    # Returns n numbers from the stream called name, as stream() would
+    # give them one at a time, but all at once if it is a BlockSampler.
+    generator = stream(state, name)
+    if isinstance(generator, BlockSampler):
+        return generator.draw(n)
+    return [generator.random() for i in range(n)]
@@ -45,7 +45,7 @@ class RandomAgent(Agent):
         if Directions.STOP in legal:
             legal.remove(Directions.STOP)
         # Random choice between the legal options.
-        return api.makeMove(random.choice(legal), legal)
+        return api.makeMove(random.choice(legal), legal, state)
         
 
 
@@ -70,12 +70,12 @@ class RandomishAgent(Agent):
         # If we can repeat the last action, do it. Otherwise make a
         # random choice.
         if self.last in legal:
-            return api.makeMove(self.last, legal)
+            return api.makeMove(self.last, legal, state)
         else:
             pick = random.choice(legal)
             # Since we changed action, record what we did
             self.last = pick
-            return api.makeMove(pick, legal)
+            return api.makeMove(pick, legal, state)
             
 class HungryAgent(Agent):
 		
@@ -123,70 +123,70 @@ class HungryAgent(Agent):
 					print "WEST GHOST"
 					if Directions.EAST == legal:
 						print "Chose Opposite "
-						return api.makeMove(Directions.EAST, legal)
+						return api.makeMove(Directions.EAST, legal, state)
 					else:
 						if Directions.WEST == legal:
 							print "Chose Random - recent"
 							legal.remove(Directions.WEST)						
 							pick = random.choice(legal)										
-							return api.makeMove(pick, legal)
+							return api.makeMove(pick, legal, state)
 							legal.add(Directions.WEST)
 						else:
 							print "Chose Random"							
 							pick = random.choice(legal)										
-							return api.makeMove(pick, legal)														
+							return api.makeMove(pick, legal, state)														
 									
 			if ghostInNext and self.last == Directions.EAST and legal:
 					print "EAST GHOST"
 					if Directions.WEST == legal:
 						print "Chose Opposite"
-						return api.makeMove(Directions.WEST, legal)
+						return api.makeMove(Directions.WEST, legal, state)
 					else:
 						if Directions.EAST == legal:
 							print "Chose Random - recent"
 							legal.remove(Directions.EAST)						
 							pick = random.choice(legal)										
-							return api.makeMove(pick, legal)
+							return api.makeMove(pick, legal, state)
 							legal.add(Directions.EAST)
 						else:
 							print "Chose Random"							
 							pick = random.choice(legal)										
-							return api.makeMove(pick, legal)			
+							return api.makeMove(pick, legal, state)			
 					
 			if ghostInNext and self.last == Directions.NORTH and legal:
 					print "NORTH GHOST"
 					if Directions.SOUTH == legal:
 						print "Chose Opposite"
-						return api.makeMove(Directions.SOUTH, legal)
+						return api.makeMove(Directions.SOUTH, legal, state)
 					else:
 						if Directions.NORTH == legal:
 							print "Chose Random - recent"
 							legal.remove(Directions.NORTH)						
 							pick = random.choice(legal)										
-							return api.makeMove(pick, legal)
+							return api.makeMove(pick, legal, state)
 							legal.add(Directions.NORTH)
 						else:
 							print "Chose Random"
 							pick = random.choice(legal)										
-							return api.makeMove(pick, legal)		
+							return api.makeMove(pick, legal, state)		
 				
 						
 			if ghostInNext and self.last == Directions.SOUTH and legal:
 					print "SOUTH GHOST"
 					if Directions.NORTH == legal:
 						print "Chose Opposite"
-						return api.makeMove(Directions.NORTH, legal)
+						return api.makeMove(Directions.NORTH, legal, state)
 					else:						
 						if Directions.SOUTH == legal:
 							print "Chose Random - recent"
 							legal.remove(Directions.SOUTH)						
 							pick = random.choice(legal)										
-							return api.makeMove(pick, legal)
+							return api.makeMove(pick, legal, state)
 							legal.add(Directions.SOUTH)
 						else:
 							print "chose random"
 							pick = random.choice(legal)										
-							return api.makeMove(pick, legal)
+							return api.makeMove(pick, legal, state)
 			
 				
 			#If not, move towards it, first to the West, then to the EAST.
@@ -195,49 +195,49 @@ class HungryAgent(Agent):
 					if pacman[0] > food[0]:
 						if Directions.WEST in legal:
 							self.last = Directions.WEST
-							return api.makeMove(Directions.WEST, legal)
+							return api.makeMove(Directions.WEST, legal, state)
 						else:
 							pick = random.choice(legal)
 							self.last = pick
-							return api.makeMove(pick, legal)
+							return api.makeMove(pick, legal, state)
 					else:
 						if Directions.EAST in legal:
 							self.last = Directions.EAST
-							return api.makeMove(Directions.EAST, legal)
+							return api.makeMove(Directions.EAST, legal, state)
 						else:
 							pick = random.choice(legal)
 							self.last = pick
-							return api.makeMove(pick, legal)
+							return api.makeMove(pick, legal, state)
 				else:
 					if not reachedY:
 						if pacman[1] > food[1]:
 							if Directions.SOUTH in legal:
 								self.last = Directions.SOUTH
-								return api.makeMove(Directions.SOUTH, legal)
+								return api.makeMove(Directions.SOUTH, legal, state)
 							else:
 								pick = random.choice(legal)
 								self.last = pick
-								return api.makeMove(pick, legal)
+								return api.makeMove(pick, legal, state)
 						else:
 							if Directions.NORTH in legal:
 								self.last = Directions.NORTH
-								return api.makeMove(Directions.NORTH, legal)
+								return api.makeMove(Directions.NORTH, legal, state)
 							else:
 								pick = random.choice(legal)
 								self.last = pick
-								return api.makeMove(pick, legal)
+								return api.makeMove(pick, legal, state)
 			else:
 				legal = api.legalActions(state)
 				if Directions.STOP in legal:
 					legal.remove(Directions.STOP)
 				
 				if self.last in legal:
-					return api.makeMove(self.last, legal)
+					return api.makeMove(self.last, legal, state)
 				else:
 					pick = random.choice(legal)
 					# Since we changed action, record what we did
 					self.last = pick
-					return api.makeMove(pick, legal)		
+					return api.makeMove(pick, legal, state)		
 				
 			
 				
@@ -251,11 +251,11 @@ class GoWestAgent(Agent):
             legal.remove(Directions.STOP)
         # Go west if possible
         if Directions.WEST in legal:
-            return api.makeMove(Directions.WEST, legal)
+            return api.makeMove(Directions.WEST, legal, state)
         # Otherwise make a random choice
         else:
             pick = random.choice(legal)
-            return api.makeMove(pick, legal)
+            return api.makeMove(pick, legal, state)
             
 class CornerSeekingAgent(Agent):
 
@@ -322,16 +322,16 @@ class CornerSeekingAgent(Agent):
         if self.BL == False:
             if pacman[0] > minX + 1:
                 if Directions.WEST in legal:
-                    return api.makeMove(Directions.WEST, legal)
+                    return api.makeMove(Directions.WEST, legal, state)
                 else:
                     pick = random.choice(legal)
-                    return api.makeMove(pick, legal)
+                    return api.makeMove(pick, legal, state)
             else:
                 if Directions.SOUTH in legal:
-                    return api.makeMove(Directions.SOUTH, legal)
+                    return api.makeMove(Directions.SOUTH, legal, state)
                 else:
                     pick = random.choice(legal)
-                    return api.makeMove(pick, legal)
+                    return api.makeMove(pick, legal, state)
         #
         # Now we've got the lower left corner
         #
@@ -348,16 +348,16 @@ class CornerSeekingAgent(Agent):
         if self.TL == False:
             if pacman[0] > minX + 1:
                 if Directions.WEST in legal:
-                    return api.makeMove(Directions.WEST, legal)
+                    return api.makeMove(Directions.WEST, legal, state)
                 else:
                     pick = random.choice(legal)
-                    return api.makeMove(pick, legal)
+                    return api.makeMove(pick, legal, state)
             else:
                 if Directions.NORTH in legal:
-                    return api.makeMove(Directions.NORTH, legal)
+                    return api.makeMove(Directions.NORTH, legal, state)
                 else:
                     pick = random.choice(legal)
-                    return api.makeMove(pick, legal)
+                    return api.makeMove(pick, legal, state)
 
         # Now, the top right corner
         
@@ -371,16 +371,16 @@ class CornerSeekingAgent(Agent):
         if self.TR == False:
             if pacman[0] < maxX - 1:
                 if Directions.EAST in legal:
-                    return api.makeMove(Directions.EAST, legal)
+                    return api.makeMove(Directions.EAST, legal, state)
                 else:
                     pick = random.choice(legal)
-                    return api.makeMove(pick, legal)
+                    return api.makeMove(pick, legal, state)
             else:
                 if Directions.NORTH in legal:
-                    return api.makeMove(Directions.NORTH, legal)
+                    return api.makeMove(Directions.NORTH, legal, state)
                 else:
                     pick = random.choice(legal)
-                    return api.makeMove(pick, legal)
+                    return api.makeMove(pick, legal, state)
 
         # Fromto right it is a straight shot South to get to the bottom right.
         
@@ -388,13 +388,13 @@ class CornerSeekingAgent(Agent):
            if pacman[1] == minY + 1:
                 print "Got to BR!"
                 self.BR = True
-                return api.makeMove(Directions.STOP, legal)
+                return api.makeMove(Directions.STOP, legal, state)
            else:
                print "Nearly there"
-               return api.makeMove(Directions.SOUTH, legal)
+               return api.makeMove(Directions.SOUTH, legal, state)
 
         print "Not doing anything!"
-        return api.makeMove(Directions.STOP, legal)
+        return api.makeMove(Directions.STOP, legal, state)
 
 # SensingAgent
 #
@@ -439,4 +439,4 @@ class SensingAgent(Agent):
         
         # getAction has to return a move. Here we pass "STOP" to the
         # API to ask Pacman to stay where they are.
-        return api.makeMove(Directions.STOP, legal)
+        return api.makeMove(Directions.STOP, legal, state)
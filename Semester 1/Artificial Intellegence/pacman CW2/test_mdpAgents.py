@@ -0,0 +1,157 @@
+# test_mdpAgents.py
+# robinson/10-dec-2018
+#
+# Checks that the different ways MDPAgent can solve a move agree. Run
+# with:
+#
+# python -m unittest test_mdpAgents
+#
+# As required by the licensing agreement for the PacMan AI we have:
+#
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+import os
+import tempfile
+import unittest
+
+import layout
+import mdpEngines
+import randomStreams
+import textDisplay
+from ghostAgents import RandomGhost
+from mdpAgents import MDPAgent
+from pacman import ClassicGameRules, GameState
+
+LAYOUTS = ["smallClassic", "mediumClassic", "originalClassic"]
+
+# The state at the start of a game on the named layout.
+def startState(name):
+    state = GameState()
+    state.initialize(layout.getLayout(name), 1000)
+    return state
+
+# The same for a new agent made with options, solved from scratch.
+def solve(state, **options):
+    return solveWith(MDPAgent(showMap=False, **options), state)
+
+# The utilities agent gives the free cells of state, by cell number,
+# starting the game afresh on state's layout.
+def solveWith(agent, state):
+    agent.registerInitialState(state)
+    mapValues = agent.createMapValues(state)
+    agent.solve(state, mapValues)
+    return agent.model.toList(mapValues)
+
+# state after every ghost has made its first legal move.
+def moveGhosts(state):
+    for agent in range(1, state.getNumAgents()):
+        state = state.generateSuccessor(agent, state.getLegalActions(agent)[0])
+    return state
+
+# Play one game on the named layout with agent, with its own random
+# streams so that it is the same game every time.
+def play(name, agent):
+    ghosts = [RandomGhost(i + 1) for i in range(4)]
+    rules = ClassicGameRules()
+    game = rules.newGame(layout.getLayout(name), agent, ghosts, textDisplay.NullGraphics(), quiet=True,
+                         streams=randomStreams.RandomStreams('test', 0))
+    game.run()
+    return game
+
+class BackendTest(unittest.TestCase):
+
+    # The python and numpy backends should do the same sweeps, so give
+    # the same utilities, to within epsilon, whichever sort of sweep
+    # they are doing.
+    def assertBackendsAgree(self, **options):
+        epsilon = 0.001
+        for name in LAYOUTS:
+            state = startState(name)
+            python = solve(state, backend="python", **options)
+            numpy = solve(state, backend="numpy", **options)
+            for i in range(len(python)):
+                self.assertAlmostEqual(python[i], numpy[i], delta=epsilon,
+                                       msg="%s cell %d: %r != %r" % (name, i, python[i], numpy[i]))
+
+    @unittest.skipUnless(mdpEngines.numpyAvailable(), "needs NumPy")
+    def testJacobi(self):
+        self.assertBackendsAgree()
+
+    @unittest.skipUnless(mdpEngines.numpyAvailable(), "needs NumPy")
+    def testInPlace(self):
+        self.assertBackendsAgree(inPlace=True)
+
+    @unittest.skipUnless(mdpEngines.numpyAvailable(), "needs NumPy")
+    def testInPlaceToEpsilon(self):
+        self.assertBackendsAgree(inPlace=True, epsilon=0.001)
+
+    # Long before they converge, so that sweeping the cells in a
+    # different order would show.
+    @unittest.skipUnless(mdpEngines.numpyAvailable(), "needs NumPy")
+    def testInPlaceFewSweeps(self):
+        self.assertBackendsAgree(inPlace=True, epsilon=0, maxLoops=3)
+
+class WarmStartTest(unittest.TestCase):
+
+    # Playing a game on each layout with an agent made with options, no
+    # move should be left with a cell more than epsilon from its
+    # Bellman update.
+    def assertSolved(self, **options):
+        epsilon = 0.001
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        try:
+            for name in LAYOUTS:
+                agent = MDPAgent(epsilon=epsilon, stats=path, showMap=False, **options)
+                play(name, agent)
+                summary = agent.stats.overall()
+                self.assertLess(summary['maxResidual'], epsilon, msg=name)
+        finally:
+            os.remove(path)
+
+    # Starting from the last move's utilities and only redoing what
+    # changed should leave every move as well solved as solving it from
+    # scratch would.
+    def testResidual(self):
+        self.assertSolved(warmStart=True)
+
+    # The same when the last move's utilities are the ones planned
+    # while the ghosts moved, whether or not the planner finished.
+    def testBackgroundResidual(self):
+        self.assertSolved(background=True)
+
+class CacheTest(unittest.TestCase):
+
+    # A game that starts with the same food and capsules, but with the
+    # ghosts somewhere else, starts from the cached utilities. That
+    # should end up as well solved as solving from scratch, and so, as
+    # neither is more than epsilon / (1 - discount) from the exact
+    # utilities, within twice that of the cold solve.
+    def testHit(self):
+        epsilon = 0.001
+        for name in LAYOUTS:
+            agent = MDPAgent(cache=256, epsilon=epsilon, showMap=False)
+            state = startState(name)
+            solveWith(agent, state)
+            agent.final(state)
+            later = moveGhosts(moveGhosts(state))
+            hit = solveWith(agent, later)
+            self.assertEqual(agent.cache.hits, 1, msg=name)
+            self.assertLess(agent.solvedResidual(), epsilon, msg=name)
+            cold = solve(later, epsilon=epsilon)
+            bound = 2 * epsilon / (1 - agent.discount)
+            for i in range(len(hit)):
+                self.assertAlmostEqual(hit[i], cold[i], delta=bound,
+                                       msg="%s cell %d: %r != %r" % (name, i, hit[i], cold[i]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,9 +28,16 @@
 
 import sys
 import inspect
-import heapq, random
+import heapq, itertools, random
 import cStringIO
 
+# NumPy is optional. PointSet and the batch distance functions use it
+# when it is there.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class FixedRandom:
     def __init__(self):
@@ -227,6 +234,150 @@ def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs( xy1[0] - xy2[0] ) + abs( xy1[1] - xy2[1] )
 
+# Lists of points shorter than this are measured in a loop. Making an
+# array out of a list of tuples costs about as much as the sums
+# themselves, so NumPy only pays for itself on long lists, or on
+# points that are already in an array.
+numpyBatch = 400
+
+def manhattanDistances( origin, points ):
+    """
+    Returns the Manhattan distances from origin to each of points, as a
+    list, or as an array if points is a NumPy array of (x, y) rows, such
+    as pointArray() or numpy.argwhere() give.
+    """
+    if np is not None and isinstance( points, np.ndarray ):
+        return manhattanDistanceArray( origin, points )
+    points = list( points )
+    if np is None or len( points ) < numpyBatch:
+        x, y = origin
+        return [abs( x - px ) + abs( y - py ) for px, py in points]
+    return manhattanDistanceArray( origin, pointArray( points ) ).tolist()
+
+def pointArray( points ):
+    "Returns a list of points as a NumPy array with an (x, y) row for each"
+    return np.fromiter( itertools.chain.from_iterable( points ), float, 2 * len( points ) ).reshape( -1, 2 )
+
+def manhattanDistanceArray( origin, array ):
+    "Returns the Manhattan distances from origin to each row of array"
+    return np.abs( array[:, 0] - origin[0] ) + np.abs( array[:, 1] - origin[1] )
+
+def pointDistances( origin, points, metric = None ):
+    """
+    Returns the distances from origin to each of points, as a list.
+
+    metric is None for the Manhattan distance, or anything with a
+    distances(origin, points) method, such as mazeDistances.MazeDistances
+    for the distance through the maze.
+    """
+    if metric is None:
+        return manhattanDistances( origin, points )
+    return metric.distances( origin, points )
+
+def nearestPoints( origin, points, k = 1, metric = None ):
+    """
+    Returns the k of points that are closest to origin, closest first.
+    Points the same distance away stay in the order they were given in.
+    """
+    points = list( points )
+    distances = pointDistances( origin, points, metric )
+    order = heapq.nsmallest( k, range( len( points ) ), key = lambda i: ( distances[i], i ) )
+    return [points[i] for i in order]
+
+def pointsWithin( origin, points, radius, metric = None ):
+    """
+    Returns the points that are no further than radius from origin, in
+    order. Like manhattanDistances(), takes and gives back an array too,
+    for the Manhattan distance.
+    """
+    if np is not None and isinstance( points, np.ndarray ) and metric is None:
+        return points[manhattanDistanceArray( origin, points ) <= radius]
+    points = list( points )
+    if np is None or len( points ) < numpyBatch:
+        distances = pointDistances( origin, points, metric )
+        return [point for point, distance in zip( points, distances ) if distance <= radius]
+    if metric is None:
+        distances = manhattanDistanceArray( origin, pointArray( points ) )
+    else:
+        distances = np.asarray( metric.distances( origin, points ) )
+    return [points[i] for i in np.flatnonzero( distances <= radius )]
+
+class PointSet:
+    """
+    A set of points that is asked for distances many times, such as the
+    food on a board, which is worth setting up once:
+
+    food = PointSet( api.food( state ) )
+    food.nearest( api.whereAmI( state ), 3 )
+
+    The distances from one point to all of them are worked out in one go
+    with NumPy, if it is there, and the points are also sorted into
+    square buckets bucketSize wide, so that within() only has to look at
+    the buckets that the radius reaches. As no path through the maze is
+    shorter than the Manhattan distance, the buckets work for
+    MazeDistances too.
+
+    The methods take the same metric as pointDistances(), and return
+    lists, like the functions above.
+    """
+    def __init__( self, points, bucketSize = 4 ):
+        self.points = list( points )
+        self.bucketSize = bucketSize
+        self.buckets = {}
+        for i, (x, y) in enumerate( self.points ):
+            self.buckets.setdefault( self.bucket( x, y ), [] ).append( i )
+        if np is not None:
+            self.array = pointArray( self.points )
+
+    def __len__( self ):
+        return len( self.points )
+
+    def bucket( self, x, y ):
+        return int( x // self.bucketSize ), int( y // self.bucketSize )
+
+    def distances( self, origin, metric = None ):
+        "Returns the distance from origin to each point, as a list"
+        if metric is not None or np is None:
+            return pointDistances( origin, self.points, metric )
+        return self.distanceArray( origin ).tolist()
+
+    def distanceArray( self, origin ):
+        return manhattanDistanceArray( origin, self.array )
+
+    def nearest( self, origin, k = 1, metric = None ):
+        "Returns the k closest points to origin, as nearestPoints() does"
+        if k >= len( self.points ) or metric is not None or np is None:
+            return nearestPoints( origin, self.points, k, metric )
+        if k <= 0:
+            return []
+        distances = self.distanceArray( origin )
+        # Everything at least as close as the k-th closest, in the order
+        # given, then sorted stably by distance
+        kth = np.partition( distances, k - 1 )[k - 1]
+        close = np.flatnonzero( distances <= kth )
+        order = close[np.argsort( distances[close], kind = 'mergesort' )][:k]
+        return [self.points[i] for i in order]
+
+    def within( self, origin, radius, metric = None ):
+        "Returns the points no further than radius from origin, in order"
+        # Looking at the buckets one by one is only worth it if there
+        # are fewer of them in reach than there are buckets altogether
+        across = 2.0 * radius / self.bucketSize + 2
+        if across * across >= len( self.buckets ):
+            if metric is not None or np is None:
+                return pointsWithin( origin, self.points, radius, metric )
+            return [self.points[i] for i in np.flatnonzero( self.distanceArray( origin ) <= radius )]
+        x, y = origin
+        left, bottom = self.bucket( x - radius, y - radius )
+        right, top = self.bucket( x + radius, y + radius )
+        indexes = []
+        for bx in range( left, right + 1 ):
+            for by in range( bottom, top + 1 ):
+                indexes.extend( self.buckets.get( (bx, by), [] ) )
+        indexes.sort()
+        points = [self.points[i] for i in indexes]
+        return pointsWithin( origin, points, radius, metric )
+
 """
   Data structures and functions useful for various course projects
 
@@ -489,14 +640,14 @@ def nSample(distribution, values, n):
             cdf += distribution[distPos]
     return samples
 
-def sample(distribution, values = None):
+def sample(distribution, values = None, generator = random):
     if type(distribution) == Counter:
         items = sorted(distribution.items())
         distribution = [i[1] for i in items]
         values = [i[0] for i in items]
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    choice = random.random()
+    choice = generator.random()
     i, total= 0, distribution[0]
     while choice > total:
         i += 1
@@ -522,11 +673,14 @@ def flipCoin( p ):
     r = random.random()
     return r < p
 
-def chooseFromDistribution( distribution ):
-    "Takes either a counter or a list of (prob, key) pairs and samples"
+def chooseFromDistribution( distribution, generator = random ):
+    """
+    Takes either a counter or a list of (prob, key) pairs and samples,
+    with numbers from generator (anything with a random() method)
+    """
     if type(distribution) == dict or type(distribution) == Counter:
-        return sample(distribution)
-    r = random.random()
+        return sample(distribution, generator = generator)
+    r = generator.random()
     base = 0.0
     for prob, element in distribution:
         base += prob